@@ -16,7 +16,18 @@ from routes.product import product_bp
 from routes.auth import auth_bp
 from routes.order import order_bp
 from routes.shoppingCart import cart_bp
+from routes.report import report_bp
+from routes.profile import profile_bp
 from extensions import db
+from commands import register_commands
+from utils.cache import product_cache
+from utils.passwords import password_hasher
+from utils.revocation import revocation_list
+from utils.replica import init_replica
+from utils.metrics import metrics
+from utils.profiling import request_profiler
+from utils.serializers import JSONProvider
+from utils.compression import compression
 
 migrate = Migrate()
 jwt = JWTManager()
@@ -26,10 +37,18 @@ def create_app():
 
     # load the configuration from the Config class in config.py
     app.config.from_object(Config)
+    app.json = JSONProvider(app)  # encode models directly, with orjson when available
 
     db.init_app(app)
     migrate.init_app(app, db)  # initialize the migration engine
     jwt.init_app(app)  # initialize JWT
+    product_cache.init_app(app)  # initialize the per-worker product cache
+    password_hasher.init_app(app)  # initialize the password hashing pool
+    revocation_list.init_app(app, jwt)  # check tokens against the revocation list
+    init_replica(app)  # keep clients that just wrote on the primary
+    metrics.init_app(app, db)  # time requests and their SQL, served at /metrics
+    request_profiler.init_app(app, db)  # profile single requests on demand or sampled
+    compression.init_app(app)  # gzip/deflate responses; registered last so the request timings include it
 
     # register the blueprints
     app.register_blueprint(user_bp, url_prefix='/users')
@@ -37,6 +56,10 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/auth')
     app.register_blueprint(order_bp, url_prefix='/orders')
     app.register_blueprint(cart_bp, url_prefix='/cart')
+    app.register_blueprint(report_bp, url_prefix='/reports')
+    app.register_blueprint(profile_bp, url_prefix='/profiles')
+
+    register_commands(app)
 
     @app.route('/')
     def home():
@@ -0,0 +1,108 @@
+"""Bytes on the wire and CPU cost of response compression, by response size.
+
+Seeds a SQLite database (or copies --db), then requests list endpoints of
+growing size and a streamed export through the test client, once without
+Accept-Encoding and once per coding, and reports the body sizes the client
+receives. The CPU cost of compressing each body is timed apart from the
+request itself (which is much noisier than the compression), the same way
+the middleware does it: in one piece for buffered responses and in the
+export's 64 KiB chunks for streamed ones. A final table shows how
+COMPRESS_LEVEL trades size for CPU on the largest JSON body.
+
+    python benchmarks/compression_bench.py --repeat 20
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from seed import seed  # noqa: E402
+
+URLS = (
+    '/products/5',
+    '/orders/all?per_page=10',
+    '/orders/all?per_page=100',
+    '/orders/all?per_page=1000',
+    '/users/all',
+    '/products/export?format=ndjson',
+)
+CODINGS = (None, 'gzip', 'deflate')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="already seeded SQLite file; copied, never modified")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'compression.db')
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+    from app import create_app
+    from extensions import db
+    from utils.compression import WBITS, _compress_stream
+    from utils.export import CHUNK_SIZE
+
+    app = create_app()
+    with app.app_context():
+        if not args.db:
+            db.create_all()
+            print(f"seeded {seed(args.users, args.products, args.orders)}")
+    client = app.test_client()
+    token = client.post('/auth/login', json={"email": "user1@example.com", "password": "benchmark"}) \
+        .get_json()["access_token"]
+    admin = {"Authorization": f"Bearer {token}"}
+
+    level = app.config['COMPRESS_LEVEL']
+    print(f"{'endpoint':<34}{'identity':>10}{'gzip':>9}{'deflate':>9}{'ratio':>7}{'gzip ms':>9}{'us/KiB':>8}")
+    largest = b''
+    for url in URLS:
+        sizes = {}
+        for coding in CODINGS:
+            headers = dict(admin, **({"Accept-Encoding": coding} if coding else {}))
+            response = client.get(url, headers=headers)
+            sizes[coding] = len(response.get_data())
+            if coding is None:
+                body, streamed = response.get_data(), response.is_streamed
+        if url.startswith('/orders') and len(body) > len(largest):
+            largest = body
+
+        started = time.process_time()
+        for _ in range(args.repeat):
+            if streamed:
+                chunks = [body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+                b''.join(_compress_stream(chunks, 'gzip', level))
+            else:
+                compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS['gzip'])
+                compressor.compress(body) + compressor.flush()
+        cpu = (time.process_time() - started) / args.repeat
+        print(f"{url:<34}{sizes[None]:>10}{sizes['gzip']:>9}{sizes['deflate']:>9}"
+              f"{sizes['gzip'] / sizes[None]:>7.2f}{cpu * 1000:>9.3f}{cpu * 1e6 / (len(body) / 1024):>8.1f}")
+    print(f"(bodies under COMPRESS_MIN_SIZE={app.config['COMPRESS_MIN_SIZE']} are sent as they are)")
+
+    print(f"\nCOMPRESS_LEVEL on a {len(largest)} byte JSON body (gzip)")
+    print(f"{'level':<7}{'bytes':>10}{'ratio':>8}{'ms':>8}{'MB/s':>8}")
+    for level in (1, 3, 6, 9):
+        started = time.process_time()
+        for _ in range(args.repeat):
+            compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS['gzip'])
+            size = len(compressor.compress(largest) + compressor.flush())
+        cpu = (time.process_time() - started) / args.repeat
+        print(f"{level:<7}{size:>10}{size / len(largest):>8.2f}{cpu * 1000:>8.2f}{len(largest) / cpu / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""Mixed-workload load benchmark with per-endpoint latency and SQL counts.
+
+Seeds a SQLite database with benchmarks/seed.py (or copies an already seeded
+one), then runs a weighted mix of scenarios - browse, search, cart churn
+and checkout - through the Flask test client or a threaded local HTTP
+server. Reports throughput, p50/p95/p99 latency and SQL statements per
+request for every endpoint, and can save the run as JSON and compare two
+saved runs.
+
+    python benchmarks/load.py --requests 5000 --threads 4 --output after.json
+    python benchmarks/load.py --compare before.json after.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from seed import WORDS, SYLLABLES, seed  # noqa: E402
+
+DEFAULT_MIX = "browse=50,search=15,cart=20,checkout=15"
+
+
+def browse(call, rng, ctx):
+    call('GET', f"/products/all?page={rng.randint(1, 50)}&per_page=20")
+    call('GET', f"/products/{rng.randint(1, ctx['products'])}")
+    if rng.random() < 0.3:
+        call('GET', f"/products/all?limit=20&sort={rng.choice(['id', 'price', 'name'])}")
+
+
+def search(call, rng, ctx):
+    term = rng.choice(WORDS) if rng.random() < 0.5 else ''.join(rng.choices(SYLLABLES, k=2))
+    call('GET', f"/products/all?search={term}&per_page=20", label='search')
+
+
+def cart(call, rng, ctx):
+    user_id = rng.randint(2, ctx['users'])
+    product_id = rng.randint(1, ctx['products'])
+    call('POST', '/cart/add', {"userId": user_id, "productId": product_id, "quantity": 1})
+    call('GET', f"/cart/{user_id}")
+    call('GET', f"/cart/{user_id}/summary")
+    call('PUT', '/cart/update', {"userId": user_id, "productId": product_id, "quantity": 2})
+    call('DELETE', '/cart/delete', {"userId": user_id, "productId": product_id})
+
+
+def checkout(call, rng, ctx):
+    user_id = rng.randint(2, ctx['users'])
+    product_ids = rng.sample(range(1, ctx['products'] + 1), 2)
+    call('POST', '/cart/batch', {"userId": user_id, "operations": [
+        {"op": "add", "productId": product_id, "quantity": 1} for product_id in product_ids]})
+    call('POST', '/orders/create', {"userId": user_id, "current_items": [
+        {"productId": product_id, "quantity": 1} for product_id in product_ids]})
+    call('DELETE', f"/cart/clear/{user_id}")
+    call('GET', f"/orders/all?userId={user_id}&limit=10")
+
+
+SCENARIOS = {"browse": browse, "search": search, "cart": cart, "checkout": checkout}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="compare two saved runs and exit")
+    parser.add_argument('--db', help="already seeded SQLite file; copied, never modified")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument('--requests', type=int, default=2000, help="scenarios to run, across all threads")
+    parser.add_argument('--warmup', type=int, default=100, help="scenarios run first and not measured")
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--client', choices=['test', 'http'], default='test')
+    parser.add_argument('--output', help="write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.compare:
+        return compare(*args.compare)
+
+    mix = {}
+    for part in args.mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            parser.error(f"unknown scenario {name}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'load.db')
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+    from flask import g, request, has_request_context
+    from sqlalchemy import event, func, select
+    from app import create_app
+    from extensions import db
+    from models.product import Product
+    from models.user import User
+
+    app = create_app()
+    with app.app_context():
+        if args.db:
+            seeded = {"db": args.db}
+        else:
+            db.create_all()
+            seeded = seed(args.users, args.products, args.orders, args.seed)
+            print(f"seeded {seeded}")
+        ctx = {"users": db.session.execute(select(func.count()).select_from(User)).scalar(),
+               "products": db.session.execute(select(func.max(Product.id))).scalar()}
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def count_statement(*_):
+            if has_request_context():
+                g._bench_sql = g.get('_bench_sql', 0) + 1
+
+    @app.after_request
+    def tag_response(response):
+        rule = request.url_rule.rule if request.url_rule else request.path
+        response.headers['X-Bench-Endpoint'] = f"{request.method} {rule}"
+        response.headers['X-Bench-SQL'] = str(g.get('_bench_sql', 0))
+        return response
+
+    open_client, close = _client(app, args.client)
+    names, weights = list(mix), list(mix.values())
+
+    def run(count, records, thread_seed):
+        rng = random.Random(thread_seed)
+        send = open_client()
+
+        def call(method, url, body=None, label=None):
+            # label splits out requests that share a route but not a code path
+            started = time.perf_counter()
+            status, endpoint, statements = send(method, url, body)
+            endpoint = endpoint or f"{method} {url}"
+            records.append((f"{endpoint} [{label}]" if label else endpoint, status,
+                            (time.perf_counter() - started) * 1000, statements))
+        for _ in range(count):
+            SCENARIOS[rng.choices(names, weights)[0]](call, rng, ctx)
+
+    run(args.warmup, [], args.seed - 1)
+
+    per_thread = [[] for _ in range(args.threads)]
+    threads = [
+        threading.Thread(target=run, args=(args.requests // args.threads + (i < args.requests % args.threads),
+                                           per_thread[i], args.seed + i))
+        for i in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    close()
+
+    records = [record for thread_records in per_thread for record in thread_records]
+    results = {
+        "meta": {
+            "args": {key: value for key, value in vars(args).items() if key not in ('compare', 'output')},
+            "seeded": seeded,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "started": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        "overall": _stats(records, elapsed),
+        "endpoints": {
+            endpoint: _stats([record for record in records if record[0] == endpoint], elapsed)
+            for endpoint in sorted({record[0] for record in records})
+        },
+    }
+    _print(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"saved to {args.output}")
+
+
+def _client(app, kind):
+    # returns (factory of per-thread send functions, close)
+    if kind == 'test':
+        def open_client():
+            client = app.test_client()
+
+            def send(method, url, body):
+                response = client.open(url, method=method, json=body)
+                response.get_data()
+                return (response.status_code, response.headers.get('X-Bench-Endpoint'),
+                        int(response.headers.get('X-Bench-SQL', 0)))
+            return send
+        return open_client, lambda: None
+
+    from werkzeug.serving import make_server
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    def open_client():
+        def send(method, url, body):
+            data = json.dumps(body).encode() if body is not None else None
+            req = urllib.request.Request(base + url, data=data, method=method,
+                                         headers={"Content-Type": "application/json"} if data else {})
+            try:
+                response = urllib.request.urlopen(req)
+            except urllib.error.HTTPError as error:
+                response = error
+            response.read()
+            return (response.status, response.headers.get('X-Bench-Endpoint'),
+                    int(response.headers.get('X-Bench-SQL', 0)))
+        return send
+    return open_client, server.shutdown
+
+
+def _stats(records, elapsed):
+    latencies = sorted(record[2] for record in records)
+    statements = [record[3] for record in records]
+    if not latencies:
+        return {"requests": 0}
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+    return {
+        "requests": len(records),
+        "errors": sum(1 for record in records if record[1] >= 500),
+        "rejected": sum(1 for record in records if 400 <= record[1] < 500),
+        "rps": round(len(records) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies), 2),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "sql_mean": round(sum(statements) / len(statements), 2),
+        "sql_max": max(statements),
+    }
+
+
+def _print(results):
+    header = f"{'endpoint':<36}{'reqs':>7}{'rps':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'sql':>6}{'4xx':>6}{'5xx':>6}"
+    print(header)
+    for name, stats in [*results["endpoints"].items(), ("overall", results["overall"])]:
+        print(f"{name:<36}{stats['requests']:>7}{stats['rps']:>9}{stats['p50_ms']:>8}{stats['p95_ms']:>8}"
+              f"{stats['p99_ms']:>8}{stats['sql_mean']:>6}{stats['rejected']:>6}{stats['errors']:>6}")
+
+
+def compare(base_path, new_path):
+    with open(base_path) as base_file, open(new_path) as new_file:
+        base, new = json.load(base_file), json.load(new_file)
+    print(f"{'endpoint':<36}{'p50 ms':>18}{'p95 ms':>18}{'p99 ms':>18}{'sql':>12}")
+    for name in sorted(set(base["endpoints"]) | set(new["endpoints"])) + ["overall"]:
+        before = base["overall"] if name == "overall" else base["endpoints"].get(name)
+        after = new["overall"] if name == "overall" else new["endpoints"].get(name)
+        if not before or not after or not before.get("requests") or not after.get("requests"):
+            print(f"{name:<36} only in {'new' if not before else 'base'} run")
+            continue
+        cells = [f"{before[key]:>7}->{after[key]:<7}{_change(before[key], after[key]):>4}"
+                 for key in ('p50_ms', 'p95_ms', 'p99_ms')]
+        print(f"{name:<36}{''.join(f'{cell:>18}' for cell in cells)}{before['sql_mean']:>5}->{after['sql_mean']:<6}")
+    print(f"throughput: {base['overall']['rps']} -> {new['overall']['rps']} requests/sec")
+
+
+def _change(before, after):
+    return f"{(after - before) / before:+.0%}" if before else ""
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCHMARKS,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    sys.exit(main())
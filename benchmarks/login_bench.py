@@ -0,0 +1,115 @@
+"""Login throughput and non-auth latency under concurrent login load.
+
+Starts the app on a threaded local server, floods /auth/login from several
+threads while a probe thread keeps requesting a product, and reports logins
+per second and the probe's p50/p99 latency. Each PASSWORD_HASH_WORKERS value
+runs in its own process so the pools do not share a machine state.
+
+    python benchmarks/login_bench.py --workers 0,4 --login-threads 16 --seconds 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--workers', default='0,4', help="comma-separated PASSWORD_HASH_WORKERS values to compare")
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--run', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(_run(args.login_threads, args.seconds)))
+        return
+
+    print(f"{'workers':>8}{'logins/s':>10}{'probe p50 ms':>14}{'probe p99 ms':>14}{'probes':>8}")
+    for workers in args.workers.split(','):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=workers.strip())
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run',
+             '--login-threads', str(args.login_threads), '--seconds', str(args.seconds)],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{workers:>8}{result['logins_per_second']:>10.1f}{result['probe_p50_ms']:>14.1f}"
+              f"{result['probe_p99_ms']:>14.1f}{result['probes']:>8}")
+
+
+def _run(login_threads, seconds):
+    db_path = os.path.join(tempfile.mkdtemp(), 'login_bench.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+
+    from werkzeug.serving import make_server
+    from app import create_app
+    from extensions import db
+    from models.product import Product
+    from models.user import User
+    from utils.passwords import password_hasher
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username="bench", email="bench@example.com",
+                            password=password_hasher.hash("secret"), role="customer"))
+        product = Product(name="probe", price=1.0, stock=1)
+        db.session.add(product)
+        db.session.commit()
+        product_id = product.id
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    login = json.dumps({"email": "bench@example.com", "password": "secret"}).encode()
+    deadline = time.monotonic() + seconds
+    logins = [0] * login_threads
+    probes = []
+
+    def login_worker(index):
+        while time.monotonic() < deadline:
+            request = urllib.request.Request(f"{base}/auth/login", data=login,
+                                             headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request).read()
+                logins[index] += 1
+            except urllib.error.HTTPError:
+                pass
+
+    def probe_worker():
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            urllib.request.urlopen(f"{base}/products/{product_id}").read()
+            probes.append((time.perf_counter() - started) * 1000)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_worker, args=(i,)) for i in range(login_threads)]
+    threads.append(threading.Thread(target=probe_worker))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.shutdown()
+
+    probes.sort()
+    return {
+        "logins_per_second": sum(logins) / seconds,
+        "probe_p50_ms": probes[len(probes) // 2] if probes else 0,
+        "probe_p99_ms": probes[int(len(probes) * 0.99)] if probes else 0,
+        "probes": len(probes)
+    }
+
+
+if __name__ == '__main__':
+    sys.exit(main())
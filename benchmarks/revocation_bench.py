@@ -0,0 +1,80 @@
+"""Revocation check cost, Bloom filter false-positive rate and memory.
+
+Loads --revoked revoked jtis into a SQLite revoked_token table, then checks
+--lookups tokens that were never revoked through the revocation list and
+through a plain per-request table lookup. Reports time per check, the
+observed and expected false-positive rates and the filter's size next to a
+Python set holding the same jtis.
+
+    python benchmarks/revocation_bench.py --revoked 100000 --lookups 50000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--revoked', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=50000)
+    parser.add_argument('--fp-rate', type=float, default=0.001)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'revocation_bench.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    os.environ['REVOCATION_BLOOM_CAPACITY'] = str(args.revoked)
+    os.environ['REVOCATION_BLOOM_FP_RATE'] = str(args.fp_rate)
+
+    from sqlalchemy import insert, select
+    from app import create_app
+    from extensions import db
+    from models.revoked_token import RevokedToken
+    from utils.revocation import revocation_list
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        expires = datetime.utcnow() + timedelta(hours=1)
+        revoked = [str(uuid.uuid4()) for _ in range(args.revoked)]
+        db.session.execute(insert(RevokedToken), [
+            {"jti": jti, "expires_at": expires, "revoked_at": datetime.utcnow()} for jti in revoked
+        ])
+        db.session.commit()
+
+        started = time.perf_counter()
+        revocation_list.is_revoked(revoked[0])
+        print(f"initial filter load: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+        fresh = [str(uuid.uuid4()) for _ in range(args.lookups)]
+        started = time.perf_counter()
+        for jti in fresh:
+            revocation_list.is_revoked(jti)
+        bloom_us = (time.perf_counter() - started) / args.lookups * 1e6
+
+        started = time.perf_counter()
+        for jti in fresh:
+            db.session.execute(select(RevokedToken.id).where(RevokedToken.jti == jti)).first()
+        table_us = (time.perf_counter() - started) / args.lookups * 1e6
+
+        assert all(revocation_list.is_revoked(jti) for jti in revoked[:1000])
+        stats = revocation_list.stats()
+
+    as_set = set(revoked)
+    set_bytes = sys.getsizeof(as_set) + sum(sys.getsizeof(jti) for jti in as_set)
+    print(f"check via Bloom filter:      {bloom_us:8.1f} us")
+    print(f"check via table lookup:      {table_us:8.1f} us")
+    print(f"false positives:             {stats['falsePositives']} of {args.lookups} "
+          f"({stats['falsePositives'] / args.lookups:.4%}, expected {stats['expectedFalsePositiveRate']:.4%})")
+    print(f"filter: {stats['filterBits']} bits, {stats['filterHashes']} hashes, "
+          f"{stats['filterBytes'] / 1024:.0f} KiB ({stats['filterBytes'] / args.revoked:.2f} bytes/token)")
+    print(f"same jtis in a Python set:   {set_bytes / 1024:.0f} KiB")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
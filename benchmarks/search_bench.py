@@ -0,0 +1,93 @@
+"""Compare the old LIKE product search with the full-text index.
+
+Generates a synthetic catalog in a fresh SQLite file, builds the FTS5
+index, then times both paths for the same search terms.
+
+    python benchmarks/search_bench.py --products 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("jade jadeite nephrite bangle ring pendant bead carving green white lavender "
+         "imperial icy translucent hetian burmese antique vintage charm bracelet necklace "
+         "earring cabochon dragon phoenix lotus buddha guanyin coin disc gourd fish").split()
+SYLLABLES = "ka lo mi ren tsu va shi po ne da gu li mo ta fe zu yo ha".split()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--per-page', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'search_bench.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+
+    from sqlalchemy import insert
+    from app import create_app
+    from extensions import db
+    from models.product import Product
+    from utils.search import create_search_index, search_products
+
+    app = create_app()
+    rng = random.Random(42)
+    # a long tail of rare words next to the common jade vocabulary, like a real catalog
+    vocabulary = sorted({''.join(rng.choices(SYLLABLES, k=4)) for _ in range(20_000)})
+    terms = ["jade", "imperial green"] + [
+        ' '.join(rng.sample(vocabulary, 1)) for _ in range(3)
+    ] + [rng.choice(vocabulary)[:5], rng.choice(WORDS) + ' ' + rng.choice(vocabulary)]
+    with app.app_context():
+        db.create_all()
+        started = time.perf_counter()
+        for offset in range(0, args.products, 10_000):
+            db.session.execute(insert(Product), [
+                {
+                    "name": ' '.join([rng.choice(WORDS)] + rng.choices(vocabulary, k=2)).title(),
+                    "description": ' '.join(rng.choices(WORDS, k=3) + rng.choices(vocabulary, k=9)),
+                    "price": rng.randint(10, 5000),
+                    "stock": rng.randint(0, 100),
+                    "is_deleted": False,
+                }
+                for _ in range(min(10_000, args.products - offset))
+            ])
+        db.session.commit()
+        print(f"loaded {args.products} products in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        create_search_index()
+        print(f"built search index in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'term':<24}{'like ms':>10}{'fts ms':>10}{'speedup':>10}{'matches':>10}")
+        for term in terms:
+            like_ms = _time(args.repeat, lambda: Product.query.filter(
+                Product.is_deleted == False, Product.name.contains(term)
+            ).paginate(page=1, per_page=args.per_page, error_out=False))
+            total = 0
+
+            def fts():
+                nonlocal total
+                _, total = search_products(term, 1, args.per_page)
+
+            fts_ms = _time(args.repeat, fts)
+            print(f"{term:<24}{like_ms:>10.1f}{fts_ms:>10.1f}{like_ms / fts_ms:>9.1f}x{total:>10}")
+
+
+def _time(repeat, func):
+    from extensions import db
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.rollback()
+    return sorted(timings)[len(timings) // 2]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Seeded synthetic data generator for benchmarks.
+
+Bulk-loads users, products, carts and historical orders into the app's
+database with executemany inserts. The same --seed always produces the same
+data, so runs against different commits are comparable.
+
+    python benchmarks/seed.py --db /tmp/bench.db --users 10000 --products 50000 --orders 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = ("jade jadeite nephrite bangle ring pendant bead carving green white lavender "
+         "imperial icy translucent hetian burmese antique vintage charm bracelet necklace "
+         "earring cabochon dragon phoenix lotus buddha guanyin coin disc gourd fish").split()
+SYLLABLES = "ka lo mi ren tsu va shi po ne da gu li mo ta fe zu yo ha".split()
+STATUSES = ('pending', 'paid', 'shipped', 'completed')
+PASSWORD = "benchmark"
+BATCH = 10_000
+
+
+def seed(users, products, orders, seed=42, max_cart_lines=5):
+    """Fill an empty schema; must run inside an app context.
+
+    User i (1-based) is user{i}@example.com with password "benchmark";
+    user 1 is an admin. Products keep enough stock for long checkout runs.
+    Returns a dict with the row counts and the seconds spent.
+    """
+    from sqlalchemy import insert, select, func
+    from extensions import db
+    from models.order import Order, OrderItem
+    from models.product import Product
+    from models.shoppingCart import Cart
+    from models.user import User
+    from utils.passwords import password_hasher
+    from utils.sales import rebuild_rollups
+    from utils.search import create_search_index
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    vocabulary = sorted({''.join(rng.choices(SYLLABLES, k=4)) for _ in range(5_000)})
+    # one hash for everyone: hashing is what the login benchmark measures, not this one
+    password = password_hasher.hash(PASSWORD)
+
+    _insert_batches(db, insert(User), (
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password": password,
+         "role": "admin" if i == 1 else "user", "is_deleted": False, "version": 1}
+        for i in range(1, users + 1)
+    ))
+    _insert_batches(db, insert(Product), (
+        {"name": ' '.join([rng.choice(WORDS)] + rng.choices(vocabulary, k=2)).title(),
+         "description": ' '.join(rng.choices(WORDS, k=3) + rng.choices(vocabulary, k=6)),
+         "price": float(rng.randint(10, 5000)), "stock": 1_000_000, "is_deleted": False,
+         "stock_shards": 0, "version": 1}
+        for _ in range(products)
+    ))
+
+    def cart_lines():
+        for user_id in range(1, users + 1):
+            for product_id in rng.sample(range(1, products + 1), min(products, rng.randint(0, max_cart_lines))):
+                yield {"user_id": user_id, "product_id": product_id, "quantity": rng.randint(1, 3)}
+    _insert_batches(db, insert(Cart), cart_lines())
+
+    # orders spread over the last year, each with 1-4 items at the product's price
+    prices = dict(db.session.execute(select(Product.id, Product.price)).all())
+    now = datetime.utcnow()
+    first_order_id = (db.session.execute(select(func.max(Order.id))).scalar() or 0) + 1
+    for offset in range(0, orders, BATCH):
+        order_rows, item_rows = [], []
+        for order_id in range(first_order_id + offset, first_order_id + min(offset + BATCH, orders)):
+            lines = [(product_id, rng.randint(1, 3))
+                     for product_id in rng.sample(range(1, products + 1), min(products, rng.randint(1, 4)))]
+            created = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+            order_rows.append({
+                "id": order_id, "user_id": rng.randint(1, users), "status": rng.choice(STATUSES),
+                "total_price": sum(prices[product_id] * quantity for product_id, quantity in lines),
+                "created_at": created, "is_deleted": False, "version": 1})
+            item_rows.extend({"order_id": order_id, "product_id": product_id, "quantity": quantity,
+                              "unit_price": prices[product_id]} for product_id, quantity in lines)
+        db.session.execute(insert(Order), order_rows)
+        db.session.execute(insert(OrderItem), item_rows)
+        db.session.commit()
+
+    create_search_index()
+    rebuild_rollups()
+    return {"users": users, "products": products, "orders": orders, "seed": seed,
+            "seconds": round(time.perf_counter() - started, 1)}
+
+
+def _insert_batches(db, statement, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH:
+            db.session.execute(statement, batch)
+            batch = []
+    if batch:
+        db.session.execute(statement, batch)
+    db.session.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', required=True, help="SQLite file to create")
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(seed(args.users, args.products, args.orders, args.seed))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""Serialization microbenchmark: model to dict to JSON, before and after.
+
+Builds in-memory products, users and orders with items, then times the
+previous hand-written to_dict() functions with Flask's default JSON
+provider against the compiled serializers with the app's JSONProvider, on
+the json module and (when installed) on orjson. Checks that the json module
+output is byte-identical to the old output and that orjson's parses to the
+same value.
+
+    python benchmarks/serialize_bench.py --count 1000 --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# the serializers as they were before compile_serializer()
+def legacy_product_dict(product):
+    return {
+        "id": product.id,
+        "productName": product.name,
+        "productDescription": product.description,
+        "productPrice": product.price,
+        "productStock": product.available_stock,
+        "is_deleted_product": product.is_deleted
+    }
+
+
+def legacy_user_dict(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "role": user.role,
+        "is_deleted": user.is_deleted
+    }
+
+
+def legacy_order_dict(order, items):
+    return {
+        "id": order.id,
+        "userId": order.user_id,
+        "totalPrice": order.total_price,
+        "status": order.status,
+        "createdAt": order.created_at.strftime("%Y-%m-%d %H:%M:%S") if order.created_at else None,
+        "updatedAt": order.updated_at.strftime("%Y-%m-%d %H:%M:%S") if order.updated_at else None,
+        "isDeletedOrder": order.is_deleted,
+        "items": items
+    }
+
+
+def legacy_order_item_dict(item):
+    return {
+        "id": item.id,
+        "orderId": item.order_id,
+        "productId": item.product_id,
+        "quantity": item.quantity,
+        "unitPrice": item.unit_price
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1000, help="objects of each kind per payload")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    from flask.json.provider import DefaultJSONProvider
+    from app import create_app
+    from models.order import Order, OrderItem
+    from models.product import Product
+    from models.user import User
+    from utils.serializers import JSONProvider, orjson
+
+    app = create_app()
+    now = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    products = [Product(id=i, name=f"Jade Bangle {i}", description="green jadeite bangle, grade A",
+                        price=100.0 + i * 0.25, stock=i % 50, is_deleted=False, stock_shards=0)
+                for i in range(1, args.count + 1)]
+    users = [User(id=i, username=f"user{i}", email=f"user{i}@example.com", role="user", is_deleted=False)
+             for i in range(1, args.count + 1)]
+    orders = []
+    for i in range(1, args.count + 1):
+        order = Order(id=i, user_id=i % 97 + 1, total_price=250.5 + i, status="paid",
+                      created_at=now - timedelta(minutes=i), updated_at=now if i % 2 else None, is_deleted=False)
+        order.order_items = [OrderItem(id=i * 3 + n, order_id=i, product_id=n + 1, quantity=n + 1,
+                                       unit_price=80.0 + n) for n in range(3)]
+        orders.append(order)
+
+    def legacy_payload():
+        return {
+            "products": [legacy_product_dict(product) for product in products],
+            "users": [legacy_user_dict(user) for user in users],
+            "orders": [legacy_order_dict(order, [legacy_order_item_dict(item) for item in order.order_items])
+                       for order in orders],
+        }
+
+    def payload():
+        return {
+            "products": [product.to_dict() for product in products],
+            "users": [user.to_dict() for user in users],
+            "orders": [order.to_dict() for order in orders],
+        }
+
+    default = DefaultJSONProvider(app)
+    app.config['JSON_BACKEND'] = 'json'
+    stdlib = JSONProvider(app)
+    compact = {"separators": (",", ":")}
+    cases = [
+        ("to_dict, legacy", legacy_payload),
+        ("to_dict, compiled", payload),
+        ("to_dict + dumps, legacy / Flask default", lambda: default.dumps(legacy_payload(), **compact)),
+        ("to_dict + dumps, compiled / json", lambda: stdlib.dumps(payload(), **compact)),
+        ("models straight to dumps / json",
+         lambda: stdlib.dumps({"products": products, "users": users, "orders": orders}, **compact)),
+    ]
+    reference = default.dumps(legacy_payload(), **compact)
+    assert stdlib.dumps(payload(), **compact) == reference, "json module output differs from the old output"
+    assert stdlib.dumps({"products": products, "users": users, "orders": orders}, **compact) == reference
+    if orjson is not None:
+        app.config['JSON_BACKEND'] = 'orjson'
+        fast = JSONProvider(app)
+        assert json.loads(fast.dumps(payload(), **compact)) == json.loads(reference)
+        cases += [
+            ("to_dict + dumps, compiled / orjson", lambda: fast.dumps(payload(), **compact)),
+            ("models straight to dumps / orjson",
+             lambda: fast.dumps({"products": products, "users": users, "orders": orders}, **compact)),
+        ]
+    else:
+        print("orjson is not installed; skipping its cases")
+
+    objects = args.count * 3
+    print(f"{objects} objects ({args.count} each of products, users, orders with 3 items); best of {args.repeat}")
+    print(f"{'case':<44}{'ms':>9}{'us/object':>11}")
+    for name, case in cases:
+        best = min(_timed(case) for _ in range(args.repeat))
+        print(f"{name:<44}{best * 1000:>9.2f}{best * 1e6 / objects:>11.2f}")
+
+
+def _timed(case):
+    started = time.perf_counter()
+    case()
+    return time.perf_counter() - started
+
+
+if __name__ == '__main__':
+    sys.exit(main())
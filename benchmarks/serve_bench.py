@@ -0,0 +1,165 @@
+"""Cold start and throughput of the production server against `flask run`.
+
+Seeds a SQLite database (or copies --db), then for each server setup
+starts it as a subprocess, measures the seconds until it answers, the
+latency of the first and second request to each of a few hot endpoints,
+and the requests/sec a pool of client threads gets out of it. Requests per
+CPU-second of the server processes (read from /proc) make setups with a
+different number of workers comparable per core.
+
+    python benchmarks/serve_bench.py --workers 1,2,4 --threads 1 --seconds 10
+"""
+import argparse
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, BENCHMARKS)
+
+from seed import seed  # noqa: E402
+
+# the first request to each of these pays for SQL compilation unless the server warmed up
+COLD_PATHS = ('/products/all?limit=20', '/products/7', '/orders/all?userId=3&limit=10', '/orders/5')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help="already seeded SQLite file; copied, never modified")
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--workers', default="1,2", help="comma-separated gunicorn worker counts")
+    parser.add_argument('--threads', type=int, default=1, help="threads per gunicorn worker")
+    parser.add_argument('--clients', type=int, default=8, help="concurrent client threads")
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--port', type=int, default=5087)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'serve.db')
+    if args.db:
+        shutil.copyfile(args.db, db_path)
+    else:
+        _seed(db_path, args)
+
+    env = dict(os.environ, SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}", PASSWORD_HASH_WORKERS='0',
+               FLASK_APP='app.py', WEB_THREADS=str(args.threads), WEB_MAX_REQUESTS='0')
+    bind = f"127.0.0.1:{args.port}"
+    gunicorn = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', bind, 'wsgi:app']
+    setups = [("flask run", [sys.executable, '-m', 'flask', 'run', '--port', str(args.port)], {})]
+    worker_counts = [int(count) for count in args.workers.split(',')]
+    setups.append((f"gunicorn w={worker_counts[0]} no warmup", gunicorn,
+                   {"WEB_WORKERS": str(worker_counts[0]), "WARMUP_ENABLED": "false"}))
+    setups.extend((f"gunicorn w={count} t={args.threads}", gunicorn, {"WEB_WORKERS": str(count)})
+                  for count in worker_counts)
+
+    print(f"{'setup':<28}{'ready s':>9}{'1st ms':>9}{'2nd ms':>9}{'req/s':>9}{'req/cpu-s':>11}")
+    for name, command, extra in setups:
+        result = _run_setup(command, dict(env, **extra), f"http://{bind}", args)
+        print(f"{name:<28}{result['ready']:>9.2f}{result['first']:>9.1f}{result['second']:>9.1f}"
+              f"{result['rps']:>9.1f}{result['per_cpu']:>11}")
+
+
+def _seed(db_path, args):
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', '0')
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f"seeded {seed(args.users, args.products, args.orders)}")
+        db.engine.dispose()
+
+
+def _run_setup(command, env, base, args):
+    started = time.perf_counter()
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    try:
+        while _get(base + '/') != 200:
+            if server.poll() is not None:
+                raise SystemExit(f"{' '.join(command)} exited with status {server.returncode}")
+            time.sleep(0.01)
+        ready = time.perf_counter() - started
+
+        # mean over the hot endpoints of the first, then the second, request to each
+        first, second = ([_timed(base + path) for path in COLD_PATHS] for _ in range(2))
+
+        cpu_before = _cpu_seconds(server.pid)
+        done = [0]
+        deadline = time.perf_counter() + args.seconds
+        lock = threading.Lock()
+
+        def client(thread_seed):
+            rng = random.Random(thread_seed)
+            count = 0
+            while time.perf_counter() < deadline:
+                _get(base + rng.choice((f"/products/all?page={rng.randint(1, 50)}&per_page=20",
+                                        f"/products/{rng.randint(1, args.products)}",
+                                        f"/orders/all?userId={rng.randint(2, args.users)}&limit=10")))
+                count += 1
+            with lock:
+                done[0] += count
+
+        clients = [threading.Thread(target=client, args=(i,)) for i in range(args.clients)]
+        window = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        window = time.perf_counter() - window
+        cpu = _cpu_seconds(server.pid) - cpu_before if cpu_before is not None else None
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait()
+
+    return {"ready": ready, "first": sum(first) / len(first), "second": sum(second) / len(second),
+            "rps": done[0] / window, "per_cpu": round(done[0] / cpu, 1) if cpu else "n/a"}
+
+
+def _get(url):
+    try:
+        with urllib.request.urlopen(url) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+    except OSError:
+        return None
+
+
+def _timed(url):
+    started = time.perf_counter()
+    _get(url)
+    return (time.perf_counter() - started) * 1000
+
+
+def _cpu_seconds(pid):
+    # user + system time of the server and its workers; None where /proc is unavailable
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as children:
+            pids = [pid] + [int(child) for child in children.read().split()]
+        ticks = 0
+        for process in pids:
+            with open(f"/proc/{process}/stat") as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+        return ticks / os.sysconf('SC_CLK_TCK')
+    except OSError:
+        return None
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,88 @@
+"""Multi-threaded stock reservation stress test against SQLite.
+
+Hammers one product from many threads until its stock runs out, then checks
+that the number of successful reservations matches the stock that was taken
+(zero oversell) and reports reservations per second.
+
+    python benchmarks/stock_stress.py --threads 16 --stock 2000 --shards 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--stock', type=int, default=2000)
+    parser.add_argument('--quantity', type=int, default=1)
+    parser.add_argument('--shards', type=int, default=0, help="0 disables sharded-counter mode")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'stock_stress.db')
+    os.environ['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from extensions import db
+    from models.product import Product
+    from utils.stock import reserve_stock, set_stock_shards, stock_levels
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        product = Product(name="hot item", price=1.0, stock=args.stock)
+        db.session.add(product)
+        db.session.flush()
+        if args.shards:
+            set_stock_shards(product, args.shards)
+        db.session.commit()
+        product_id = product.id
+
+    reserved = [0] * args.threads
+    retries = [0] * args.threads
+
+    def worker(index):
+        with app.app_context():
+            while True:
+                try:
+                    ok, _ = reserve_stock({product_id: args.quantity})
+                    if not ok:
+                        return
+                    db.session.commit()
+                    reserved[index] += 1
+                except OperationalError:
+                    # SQLite allows a single writer; a busy database is retried, not counted
+                    db.session.rollback()
+                    retries[index] += 1
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        remaining = stock_levels([product_id])[product_id]
+
+    taken = sum(reserved) * args.quantity
+    print(f"threads={args.threads} shards={args.shards} stock={args.stock} quantity={args.quantity}")
+    print(f"reservations={sum(reserved)} busy_retries={sum(retries)} remaining={remaining}")
+    print(f"elapsed={elapsed:.3f}s reservations/sec={sum(reserved) / elapsed:.0f}")
+
+    if remaining < 0 or taken + remaining != args.stock:
+        print("FAIL: reserved more stock than was available")
+        return 1
+    print("OK: zero oversell")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
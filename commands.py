@@ -0,0 +1,67 @@
+import sqlite3
+import click
+from flask import current_app
+from extensions import db
+from utils.search import create_search_index
+from utils.product_import import import_products, FORMATS
+from utils.revocation import revocation_list
+from utils.sales import rebuild_rollups
+
+
+def register_commands(app):
+    # maintenance commands, run with `flask <command>`
+
+    @app.cli.command('search-index')
+    @click.option('--no-rebuild', is_flag=True, help="Only create the index and triggers.")
+    def search_index(no_rebuild):
+        """Create the SQLite product search index and fill it from product."""
+        if create_search_index(rebuild=not no_rebuild):
+            click.echo("Product search index is ready.")
+        else:
+            click.echo("Nothing to do: this database keeps its full-text index through migrations.")
+
+    @app.cli.command('import-products')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(FORMATS), help="Defaults to the file extension.")
+    @click.option('--mode', type=click.Choice(['insert', 'upsert']), default='insert', show_default=True)
+    @click.option('--batch-size', type=int, help="Rows per batch; defaults to IMPORT_BATCH_SIZE.")
+    def import_products_command(path, fmt, mode, batch_size):
+        """Bulk load products from an NDJSON or CSV file."""
+        fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        with open(path, 'rb') as stream:
+            report = import_products(stream, fmt, mode,
+                                     batch_size or current_app.config['IMPORT_BATCH_SIZE'],
+                                     current_app.config['IMPORT_MAX_REPORTED_ERRORS'])
+
+        for error in report.errors:
+            click.echo(f"line {error['line']}: {error['error']}", err=True)
+        if report.failed > len(report.errors):
+            click.echo(f"... {report.failed - len(report.errors)} more errors not shown", err=True)
+        summary = report.to_dict()
+        click.echo(f"{summary['rows']} rows: {summary['inserted']} inserted, {summary['updated']} updated, "
+                   f"{summary['failed']} failed in {summary['seconds']}s ({summary['rowsPerSecond']} rows/sec)")
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens():
+        """Delete revocations of tokens that have already expired."""
+        click.echo(f"Removed {revocation_list.purge()} expired revocations.")
+
+    @app.cli.command('rebuild-rollups')
+    @click.option('--chunk-size', type=int, default=5000, show_default=True, help="Orders aggregated per transaction.")
+    def rebuild_rollups_command(chunk_size):
+        """Recompute the daily sales rollups from the order tables."""
+        click.echo(f"Rebuilt sales rollups from {rebuild_rollups(chunk_size)} orders.")
+
+    @app.cli.command('sync-replica')
+    def sync_replica():
+        """Copy a SQLite primary onto its SQLite replica, for trying out read routing locally."""
+        replica_uri = current_app.config['SQLALCHEMY_REPLICA_URI']
+        if not replica_uri:
+            raise click.ClickException("SQLALCHEMY_REPLICA_URI is not set.")
+        primary, replica = db.engine, db.engines['replica']
+        if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+            raise click.ClickException("Only SQLite files can be copied; use the database's own replication.")
+
+        with sqlite3.connect(primary.url.database) as source, sqlite3.connect(replica.url.database) as target:
+            source.backup(target)
+        click.echo(f"Copied {primary.url.database} to {replica.url.database}.")
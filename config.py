@@ -4,9 +4,97 @@ from dotenv import load_dotenv
 # load the environment variables from the .env file
 load_dotenv()
 
+
+def _pool_options(prefix, uri, defaults=None):
+    # connection pool settings for one bind, read from <prefix>_POOL_SIZE etc.
+    defaults = defaults or {}
+    options = {
+        "pool_pre_ping": os.getenv(f"{prefix}_POOL_PRE_PING", str(defaults.get("pool_pre_ping", True))).lower() == "true",
+        "pool_recycle": int(os.getenv(f"{prefix}_POOL_RECYCLE", defaults.get("pool_recycle", 1800))),
+    }
+    # in-memory SQLite shares a single connection, which takes no pool sizes
+    if uri and uri not in ("sqlite://", "sqlite:///:memory:"):
+        options["pool_size"] = int(os.getenv(f"{prefix}_POOL_SIZE", defaults.get("pool_size", 10)))
+        options["max_overflow"] = int(os.getenv(f"{prefix}_MAX_OVERFLOW", defaults.get("max_overflow", 20)))
+    return options
+
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "default_secret_key")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "default_jwt_secret_key")
     SQLALCHEMY_DATABASE_URI = os.getenv("SQLALCHEMY_DATABASE_URI", "sqlite:///test.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = os.getenv("SQLALCHEMY_TRACK_MODIFICATIONS", False)
+    # primary pool: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE (seconds), DB_POOL_PRE_PING
+    SQLALCHEMY_ENGINE_OPTIONS = _pool_options("DB", SQLALCHEMY_DATABASE_URI)
+    # optional read replica for endpoints marked replica_read; its pool takes
+    # REPLICA_POOL_SIZE etc. and falls back to the primary's settings
+    SQLALCHEMY_REPLICA_URI = os.getenv("SQLALCHEMY_REPLICA_URI")
+    SQLALCHEMY_BINDS = {
+        "replica": {"url": SQLALCHEMY_REPLICA_URI,
+                    **_pool_options("REPLICA", SQLALCHEMY_REPLICA_URI, SQLALCHEMY_ENGINE_OPTIONS)}
+    } if SQLALCHEMY_REPLICA_URI else {}
+    # seconds a client's reads stay on the primary after it wrote
+    REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
     JWT_ACCESS_TOKEN_EXPIRES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRES", 3600))
+    # keyset pagination: largest page a client may ask for, and how long an
+    # exact total (with_total=true) is reused before it is counted again
+    PAGINATION_MAX_LIMIT = int(os.getenv("PAGINATION_MAX_LIMIT", 100))
+    PAGINATION_COUNT_TTL = int(os.getenv("PAGINATION_COUNT_TTL", 30))
+    # product cache: catalog entries and list pages are cached per worker;
+    # stock has its own short TTL (0 reads it fresh on every request)
+    PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", 10000))
+    PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", 300))
+    PRODUCT_STOCK_TTL = int(os.getenv("PRODUCT_STOCK_TTL", 2))
+    PRODUCT_LIST_CACHE_SIZE = int(os.getenv("PRODUCT_LIST_CACHE_SIZE", 1000))
+    PRODUCT_LIST_CACHE_TTL = int(os.getenv("PRODUCT_LIST_CACHE_TTL", 30))
+    # most stock shard rows one product may spread its stock over
+    PRODUCT_MAX_STOCK_SHARDS = int(os.getenv("PRODUCT_MAX_STOCK_SHARDS", 64))
+    # most ids one /products/batch request may ask for
+    PRODUCT_BATCH_MAX_IDS = int(os.getenv("PRODUCT_BATCH_MAX_IDS", 100))
+    # keep a per-user cart summary row up to date for O(1) cart badge reads
+    CART_SUMMARY_ENABLED = os.getenv("CART_SUMMARY_ENABLED", "true").lower() == "true"
+    # bulk product import: rows per executemany/commit, and how many row errors are reported
+    IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+    IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", 1000))
+    # rows fetched per server-side cursor round trip by the streaming exports
+    EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+    # password KDF: method string as understood by werkzeug (changing it makes
+    # logins rehash old passwords), and the process pool that runs it
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+    PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", 16))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+    PASSWORD_HASH_TIMEOUT = int(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+    # revoked JWTs: each worker keeps a Bloom filter sized for this many tokens at
+    # this false-positive rate, pulls new revocations every REVOCATION_REFRESH_SECONDS
+    # and deletes expired ones every REVOCATION_PURGE_SECONDS
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+    REVOCATION_BLOOM_FP_RATE = float(os.getenv("REVOCATION_BLOOM_FP_RATE", 0.001))
+    REVOCATION_REFRESH_SECONDS = int(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+    # each refresh re-reads revocations this far back, for rows that committed late
+    # or were stamped by a worker whose clock is behind
+    REVOCATION_REFRESH_SKEW_SECONDS = int(os.getenv("REVOCATION_REFRESH_SKEW_SECONDS", 30))
+    REVOCATION_PURGE_SECONDS = int(os.getenv("REVOCATION_PURGE_SECONDS", 3600))
+    # request instrumentation: Server-Timing headers and /metrics histograms, plus a
+    # JSON line on the jade.slow logger for requests and statements over these thresholds
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    SLOW_REQUEST_MS = int(os.getenv("SLOW_REQUEST_MS", 500))
+    SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 100))
+    # request profiling: admins send X-Profile to profile one request, and this share
+    # of all requests is profiled at random; the newest PROFILE_MAX_FILES are kept
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", 200))
+    # wsgi.py sends a few read-only requests before the server forks its workers,
+    # so the first real requests don't pay for mapper setup and SQL compilation
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    # JSON encoder for responses: json matches Flask's output byte for byte, orjson
+    # is faster but escapes non-ASCII and formats exponent floats differently
+    JSON_BACKEND = os.getenv("JSON_BACKEND", "json")
+    # gzip/deflate for clients that accept it: buffered responses from COMPRESS_MIN_SIZE
+    # bytes, streamed ones always; only these types (never already-compressed ones)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", 6))
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    COMPRESS_MIMETYPES = os.getenv(
+        "COMPRESS_MIMETYPES", "application/json,application/x-ndjson,text/csv,text/plain,text/html").split(",")
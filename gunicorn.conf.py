@@ -0,0 +1,41 @@
+"""Gunicorn settings for the production server.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported and warmed up once in the master, then forked into
+WEB_WORKERS processes of WEB_THREADS threads each. Every worker is replaced
+after about WEB_MAX_REQUESTS requests, with jitter so they don't all
+restart together. kill -HUP replaces the workers gracefully; because the
+app is preloaded, deploying new code needs USR2 then QUIT on the old
+master (or a container restart).
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.getenv("WEB_THREADS", 1))
+# 0 turns worker recycling off
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 1000))
+timeout = int(os.getenv("WEB_TIMEOUT", 30))
+# in-flight requests get this long to finish on HUP, TERM or recycling
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("WEB_KEEPALIVE", 5))
+preload_app = True
+accesslog = os.getenv("WEB_ACCESS_LOG")
+errorlog = "-"
+
+
+def when_ready(server):
+    from wsgi import warmup_seconds
+    server.log.info("app loaded and warmed up in %.2fs", warmup_seconds)
+
+
+def post_fork(server, worker):
+    # connections opened in the master must not be shared between workers
+    from extensions import db
+    from wsgi import app
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
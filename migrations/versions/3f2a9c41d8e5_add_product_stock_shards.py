@@ -0,0 +1,35 @@
+"""Add sharded stock counters for hot products
+
+Revision ID: 3f2a9c41d8e5
+Revises: b7119a1447e9
+Create Date: 2026-10-18 09:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c41d8e5'
+down_revision = 'b7119a1447e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('stock_shards', sa.Integer(), server_default='0', nullable=False))
+
+    op.create_table('product_stock_shard',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('shard_no', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('stock', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['product.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'shard_no')
+    )
+
+
+def downgrade():
+    op.drop_table('product_stock_shard')
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_column('stock_shards')
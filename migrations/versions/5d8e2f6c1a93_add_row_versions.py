@@ -0,0 +1,28 @@
+"""Add version counters to product, order and user
+
+Revision ID: 5d8e2f6c1a93
+Revises: 9c5e1b7a2d40
+Create Date: 2026-10-18 13:40:09.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2f6c1a93'
+down_revision = '9c5e1b7a2d40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('product', 'order', 'user'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    for table in ('user', 'order', 'product'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('version')
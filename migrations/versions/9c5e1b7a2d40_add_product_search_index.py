@@ -0,0 +1,52 @@
+"""Add full-text search index on product name and description
+
+Revision ID: 9c5e1b7a2d40
+Revises: 3f2a9c41d8e5
+Create Date: 2026-10-18 11:02:37.905113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c5e1b7a2d40'
+down_revision = '3f2a9c41d8e5'
+branch_labels = None
+depends_on = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE product_fts USING fts5("
+    "name, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO product_fts(product_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(statement)
+    elif dialect == 'mysql':
+        op.create_index('ft_product_name_description', 'product', ['name', 'description'], mysql_prefix='FULLTEXT')
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for trigger in ('product_fts_ai', 'product_fts_ad', 'product_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS product_fts")
+    elif dialect == 'mysql':
+        op.drop_index('ft_product_name_description', table_name='product')
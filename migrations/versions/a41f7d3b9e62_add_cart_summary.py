@@ -0,0 +1,30 @@
+"""Add per-user cart summary table
+
+Revision ID: a41f7d3b9e62
+Revises: 5d8e2f6c1a93
+Create Date: 2026-10-18 15:21:54.170336
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41f7d3b9e62'
+down_revision = '5d8e2f6c1a93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cart_summary',
+    sa.Column('user_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('item_count', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('cart_summary')
@@ -0,0 +1,26 @@
+"""Index revoked_token.revoked_at for the revocation refresh
+
+Revision ID: b2d94e7c1f36
+Revises: f5c2d8a71b04
+Create Date: 2026-10-18 21:14:05.319274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d94e7c1f36'
+down_revision = 'f5c2d8a71b04'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_token_revoked_at'), ['revoked_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_token', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_token_revoked_at'))
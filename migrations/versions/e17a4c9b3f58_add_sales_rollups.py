@@ -0,0 +1,38 @@
+"""Add daily sales rollup tables
+
+Revision ID: e17a4c9b3f58
+Revises: c83b5e0f7d21
+Create Date: 2026-10-18 18:12:40.915377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e17a4c9b3f58'
+down_revision = 'c83b5e0f7d21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('product_sales_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('product_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'product_id')
+    )
+    op.create_table('order_status_daily',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'status')
+    )
+
+
+def downgrade():
+    op.drop_table('order_status_daily')
+    op.drop_table('product_sales_daily')
@@ -0,0 +1,72 @@
+"""Add indexes for the hot query paths and a unique cart line per product
+
+Revision ID: f5c2d8a71b04
+Revises: e17a4c9b3f58
+Create Date: 2026-10-18 19:02:27.604118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c2d8a71b04'
+down_revision = 'e17a4c9b3f58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # merge duplicate cart lines into the oldest one before they become impossible
+    connection = op.get_bind()
+    cart = sa.table('cart', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer),
+                    sa.column('product_id', sa.Integer), sa.column('quantity', sa.Integer))
+    duplicates = connection.execute(
+        sa.select(sa.func.min(cart.c.id), cart.c.user_id, cart.c.product_id, sa.func.sum(cart.c.quantity))
+        .group_by(cart.c.user_id, cart.c.product_id)
+        .having(sa.func.count() > 1)
+    ).all()
+    for keep_id, user_id, product_id, quantity in duplicates:
+        connection.execute(cart.update().where(cart.c.id == keep_id).values(quantity=quantity))
+        connection.execute(cart.delete().where(cart.c.user_id == user_id, cart.c.product_id == product_id,
+                                               cart.c.id != keep_id))
+
+    with op.batch_alter_table('cart', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_cart_user_id_product_id', ['user_id', 'product_id'])
+        batch_op.create_index('ix_cart_product_id', ['product_id'], unique=False)
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.create_index('ix_order_user_id_is_deleted', ['user_id', 'is_deleted', 'id'], unique=False)
+        batch_op.create_index('ix_order_is_deleted_id', ['is_deleted', 'id'], unique=False)
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_items_order_id'), ['order_id'], unique=False)
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_is_deleted_id', ['is_deleted', 'id'], unique=False)
+        batch_op.create_index('ix_product_is_deleted_price', ['is_deleted', 'price', 'id'], unique=False)
+        batch_op.create_index('ix_product_is_deleted_name', ['is_deleted', 'name', 'id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_is_deleted_id', ['is_deleted', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_is_deleted_id')
+
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_is_deleted_name')
+        batch_op.drop_index('ix_product_is_deleted_price')
+        batch_op.drop_index('ix_product_is_deleted_id')
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_items_order_id'))
+
+    with op.batch_alter_table('order', schema=None) as batch_op:
+        batch_op.drop_index('ix_order_is_deleted_id')
+        batch_op.drop_index('ix_order_user_id_is_deleted')
+
+    with op.batch_alter_table('cart', schema=None) as batch_op:
+        batch_op.drop_index('ix_cart_product_id')
+        batch_op.drop_constraint('uq_cart_user_id_product_id', type_='unique')
@@ -1,4 +1,5 @@
 from extensions import db
+from utils.serializers import compile_serializer, register
 from datetime import datetime
 
 class Order(db.Model):
@@ -10,35 +11,91 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, onupdate=datetime.utcnow)
     is_deleted = db.Column(db.Boolean, default=False)
+    # bumped on every ORM update; used for ETags and optimistic concurrency
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
+    # order history is read per user, and listings page over non-deleted orders by id
+    __table_args__ = (
+        db.Index('ix_order_user_id_is_deleted', 'user_id', 'is_deleted', 'id'),
+        db.Index('ix_order_is_deleted_id', 'is_deleted', 'id'),
+    )
 
     order_items = db.relationship('OrderItem', backref='order', lazy=True)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "userId": self.user_id,
-            "totalPrice": self.total_price,
-            "status": self.status,
-            "createdAt": self.created_at.strftime("%Y-%m-%d %H:%M:%S") if self.created_at else None,
-            "updatedAt": self.updated_at.strftime("%Y-%m-%d %H:%M:%S") if self.updated_at else None,
-            "isDeletedOrder": self.is_deleted,
-            "items": [item.to_dict() for item in self.order_items]
-        }
+        return order_dict(self, [item.to_dict() for item in self.order_items])
 
 
 class OrderItem(db.Model):
     __tablename__ = 'order_items'
     id = db.Column(db.Integer, primary_key=True)
-    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     unit_price = db.Column(db.Float, nullable=False)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "orderId": self.order_id,
-            "productId": self.product_id,
-            "quantity": self.quantity,
-            "unitPrice": self.unit_price
-        }
+        return order_item_dict(self)
+
+
+ORDER_COLUMNS = (Order.id, Order.user_id, Order.total_price, Order.status,
+                 Order.created_at, Order.updated_at, Order.is_deleted)
+ORDER_ITEM_COLUMNS = (OrderItem.id, OrderItem.order_id, OrderItem.product_id,
+                      OrderItem.quantity, OrderItem.unit_price)
+
+
+def order_dicts(order_ids, fields=None):
+    """Serialize orders and their items straight from row tuples.
+
+    Runs two queries whatever the number of orders (one for the orders, one
+    for all of their items) and never builds ORM objects. The result follows
+    the order of order_ids and matches Order.to_dict(). With a FieldSet only
+    its columns are selected, and items are only queried when it includes
+    them.
+    """
+    if not order_ids:
+        return []
+
+    encode, columns, with_items = order_dict, ORDER_COLUMNS, True
+    if fields is not None:
+        encode, with_items = fields.encode, 'items' in fields.includes
+        columns = [getattr(Order, attribute) for attribute in fields.attributes]
+
+    items = {}
+    if with_items:
+        item_rows = db.session.execute(
+            db.select(*ORDER_ITEM_COLUMNS).where(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id)
+        )
+        for row in item_rows:
+            items.setdefault(row.order_id, []).append(order_item_dict(row))
+
+    orders = {
+        row.id: encode(row, items.get(row.id, [])) if with_items else encode(row)
+        for row in db.session.execute(db.select(*columns).where(Order.id.in_(order_ids)))
+    }
+    return [orders[order_id] for order_id in order_ids if order_id in orders]
+
+
+# shared by to_dict() and order_dicts(); works on model instances and result rows alike
+ORDER_FIELDS = (
+    ("id", "id"),
+    ("userId", "user_id"),
+    ("totalPrice", "total_price"),
+    ("status", "status"),
+    ("createdAt", "created_at", "datetime"),
+    ("updatedAt", "updated_at", "datetime"),
+    ("isDeletedOrder", "is_deleted"),
+    ("items", "items"),
+)
+order_dict = compile_serializer("order_dict", ORDER_FIELDS, args=("items",))
+
+order_item_dict = compile_serializer("order_item_dict", (
+    ("id", "id"),
+    ("orderId", "order_id"),
+    ("productId", "product_id"),
+    ("quantity", "quantity"),
+    ("unitPrice", "unit_price"),
+))
+register(Order, Order.to_dict)
+register(OrderItem, order_item_dict)
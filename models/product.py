@@ -1,4 +1,5 @@
 from extensions import db
+from utils.serializers import compile_serializer, register
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -7,14 +8,50 @@ class Product(db.Model):
     price = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False)
     is_deleted = db.Column(db.Boolean, default=False)
+    # number of sub-rows the stock is spread across for hot products; 0 keeps it on this row
+    stock_shards = db.Column(db.Integer, default=0, nullable=False)
+    # bumped on every ORM update; used for ETags and optimistic concurrency
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
+    # catalog listings filter out deleted products and page by id, price or name
+    __table_args__ = (
+        db.Index('ix_product_is_deleted_id', 'is_deleted', 'id'),
+        db.Index('ix_product_is_deleted_price', 'is_deleted', 'price', 'id'),
+        db.Index('ix_product_is_deleted_name', 'is_deleted', 'name', 'id'),
+    )
+
+    shards = db.relationship('ProductStockShard', lazy=True)
+
+    @property
+    def available_stock(self):
+        if not self.stock_shards:
+            return self.stock
+        return self.stock + sum(shard.stock for shard in self.shards)
 
     def to_dict(self):
-        return {
-            "id": self.id,
-            "productName": self.name,
-            "productDescription": self.description,
-            "productPrice": self.price,
-            "productStock": self.stock,
-            "is_deleted_product": self.is_deleted
-        }
+        return product_dict(self)
+
+
+# stock sub-row of a product in sharded-counter mode
+class ProductStockShard(db.Model):
+    __tablename__ = 'product_stock_shard'
+    product_id = db.Column(db.Integer, db.ForeignKey('product.id'), primary_key=True)
+    shard_no = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    stock = db.Column(db.Integer, nullable=False, default=0)
+
 
+# shared by to_dict() and row-based serializers; needs id, name, description,
+# price, available_stock and is_deleted attributes
+PRODUCT_FIELDS = (
+    ("id", "id"),
+    ("productName", "name"),
+    ("productDescription", "description"),
+    ("productPrice", "price"),
+    ("productStock", "available_stock"),
+    ("is_deleted_product", "is_deleted"),
+)
+# columns behind the non-column attributes, for sparse fieldsets
+PRODUCT_COMPUTED = {"available_stock": ("stock", "stock_shards")}
+product_dict = compile_serializer("product_dict", PRODUCT_FIELDS)
+register(Product, product_dict)
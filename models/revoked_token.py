@@ -0,0 +1,11 @@
+from datetime import datetime
+from extensions import db
+
+
+# jtis of tokens revoked before they expired; rows are purged once the token would have expired anyway
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
@@ -0,0 +1,19 @@
+from extensions import db
+
+
+# revenue and units sold per product per day (by order creation date), excluding deleted orders
+class ProductSalesDaily(db.Model):
+    __tablename__ = 'product_sales_daily'
+    day = db.Column(db.Date, primary_key=True)
+    product_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+# orders and their value per current status, grouped by the day the orders were created
+class OrderStatusDaily(db.Model):
+    __tablename__ = 'order_status_daily'
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
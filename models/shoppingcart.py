@@ -5,4 +5,26 @@ class Cart(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'), nullable=False)
-    quantity = db.Column(db.Integer, nullable=False)
\ No newline at end of file
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # one row per product in a cart, so adding to the cart can be a single upsert;
+    # product_id is for the price and delete fan-out to carts holding a product
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'product_id', name='uq_cart_user_id_product_id'),
+        db.Index('ix_cart_product_id', 'product_id'),
+    )
+
+
+# per-user cart totals, kept up to date by the cart endpoints so the cart badge is a single-row read
+class CartSummary(db.Model):
+    __tablename__ = 'cart_summary'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True, autoincrement=False)
+    item_count = db.Column(db.Integer, nullable=False, default=0)
+    total_price = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            "userId": self.user_id,
+            "itemCount": self.item_count,
+            "totalPrice": self.total_price
+        }
@@ -1,4 +1,5 @@
 from extensions import db
+from utils.serializers import compile_serializer, register
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -7,14 +8,26 @@ class User(db.Model):
     password = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(50), default="user")
     is_deleted = db.Column(db.Boolean, default=False)
+    # bumped on every ORM update; used for ETags and optimistic concurrency
+    version = db.Column(db.Integer, nullable=False, default=1)
+
+    __mapper_args__ = {"version_id_col": version}
+    __table_args__ = (db.Index('ix_user_is_deleted_id', 'is_deleted', 'id'),)
+
 # define the to_dict method to return a dictionary representation of the User object
     def to_dict(self):
-        return {
-            "id": self.id,
-            "username": self.username,
-            "email": self.email,
-            "role": self.role, 
-            "is_deleted": self.is_deleted
-        }
+        return user_dict(self)
     def is_admin(self):
-        return self.role == "admin"
\ No newline at end of file
+        return self.role == "admin"
+
+
+# shared by to_dict() and row-based serializers
+USER_FIELDS = (
+    ("id", "id"),
+    ("username", "username"),
+    ("email", "email"),
+    ("role", "role"),
+    ("is_deleted", "is_deleted"),
+)
+user_dict = compile_serializer("user_dict", USER_FIELDS)
+register(User, user_dict)
@@ -1,8 +1,11 @@
 from flask import Blueprint, jsonify, request
-from werkzeug.security import check_password_hash
-from flask_jwt_extended import create_access_token, jwt_required, unset_jwt_cookies, get_jwt_identity
+from flask_jwt_extended import create_access_token, jwt_required, unset_jwt_cookies, get_jwt
+from sqlalchemy.orm.exc import StaleDataError
 from models.user import User
+from extensions import db
+from utils.passwords import password_hasher, HashingBusy
 from utils.decorators import role_required
+from utils.revocation import revocation_list
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -18,18 +21,32 @@ def login():
 
     # search for the user in the database
     user = User.query.filter_by(email=email, is_deleted=False).first()
-    if not user or not check_password_hash(user.password, password):
-        return jsonify({"error": "Invalid email or password"}), 401
+    try:
+        if not user or not password_hasher.verify(user.password, password):
+            return jsonify({"error": "Invalid email or password"}), 401
+
+        # upgrade hashes made with older KDF settings while we know the password
+        if password_hasher.needs_rehash(user.password):
+            user.password = password_hasher.hash(password)
+            try:
+                db.session.commit()
+            except StaleDataError:
+                # the user was changed meanwhile; the login stands, the next one rehashes
+                db.session.rollback()
+    except HashingBusy:
+        return jsonify({"error": "Server is busy, please retry"}), 503
     identity = {"id": user.id, "email": user.email, "role": user.role}
-    print("Identity:", identity)
     # create JWT Token
-    access_token = create_access_token(identity=identity)
+    access_token = create_access_token(identity=identity, additional_claims={"role": user.role})
     return jsonify({"message": "Login successful", "access_token": access_token}), 200
 
 # logout route
 @auth_bp.route('/logout', methods=['POST'])
 @jwt_required()
 def logout():
+    # revoke the token itself so it stops working everywhere, not just in this browser
+    claims = get_jwt()
+    revocation_list.revoke(claims["jti"], claims["exp"])
     response = jsonify({"message": "Logged out successfully"})
     # clear JWT Token
     unset_jwt_cookies(response)
@@ -40,6 +57,10 @@ def logout():
 @jwt_required()
 @role_required('admin')  # use the role_required decorator to restrict access to admin users only
 def admin_only_route():
-    identity = get_jwt_identity()
-    print("JWT Identity:", identity) # print the JWT Identity
-    return jsonify({"message": "Welcome, Admin!"}), 200
\ No newline at end of file
+    return jsonify({"message": "Welcome, Admin!"}), 200
+
+# revocation list and Bloom filter statistics
+@auth_bp.route('/revocations/stats', methods=['GET'])
+@role_required('admin')
+def revocation_stats():
+    return jsonify(revocation_list.stats()), 200
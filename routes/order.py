@@ -1,26 +1,52 @@
 from flask import Blueprint, request, jsonify
-from models.order import Order, OrderItem
+from sqlalchemy import insert
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
+from models.order import Order, OrderItem, ORDER_FIELDS, order_dicts
 from models.product import Product
 from models.user import User
 from models.shoppingCart import Cart
 from extensions import db
+from utils.stock import reserve_stock
+from utils.pagination import wants_keyset, keyset_paginate
+from utils.cache import product_cache
+from utils.cart_summary import adjust_cart_summary
+from utils.sales import record_order, record_status_change, remove_order
+from utils.etag import etag_for, is_not_modified, if_match_failed, not_modified, precondition_failed, tagged
+from utils.export import export_orders
+from utils.decorators import role_required
+from utils.replica import replica_read
+from utils.fields import requested_fields
 
 order_bp = Blueprint('orders', __name__)
 # get all orders
 @order_bp.route('/all', methods=['GET'])
+@replica_read
 def get_all_orders():
     page = request.args.get('page', 1, type=int)  
     per_page = request.args.get('per_page', 10, type=int)  
     user_id = request.args.get('userId', type=int)
+    try:
+        fields = requested_fields("order_fields", ORDER_FIELDS, relations=("items",))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    query = Order.query.filter_by(is_deleted=False)
+    query = db.select(Order.id).filter_by(is_deleted=False)
 
     if user_id:
         query = query.filter_by(user_id=user_id)
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    if wants_keyset():
+        try:
+            keyset = keyset_paginate(query, {"id": Order.id, "total_price": Order.total_price}, Order.id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"orders": order_dicts(keyset.items, fields), **keyset.meta()}), 200
 
-    orders = [order.to_dict() for order in pagination.items]
+    # page over ids only, then serialize the page with a fixed number of queries
+    pagination = db.paginate(query.order_by(Order.id), page=page, per_page=per_page, error_out=False)
+
+    orders = order_dicts(pagination.items, fields)
 
     return jsonify({
         "orders": orders,
@@ -29,6 +55,16 @@ def get_all_orders():
         "current_page": pagination.page
     }), 200
 
+# streaming export (admin only): ?format=ndjson|csv
+@order_bp.route('/export', methods=['GET'])
+@replica_read
+@role_required('admin')
+def export_orders_route():
+    try:
+        return export_orders()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
 # create order
 @order_bp.route('/create', methods=['POST'])
 def create_order():
@@ -40,84 +76,138 @@ def create_order():
     if not user_id:
         return jsonify({"error": "Missing userId"}), 400
 
-    total_price = 0
-    order_items = []
-
     if cart_item_ids:
         cart_items = Cart.query.filter(Cart.id.in_(cart_item_ids), Cart.user_id == user_id).all()
         if not cart_items:
             return jsonify({"error": "No valid cart items found"}), 404
 
-        for cart_item in cart_items:
-            product = Product.query.filter_by(id=cart_item.product_id, is_deleted=False).first()
-            if not product:
-                return jsonify({"error": f"Product with ID {cart_item.product_id} not found"}), 404
-
-            if cart_item.quantity > product.stock:
-                return jsonify({"error": f"Insufficient stock for product ID {cart_item.product_id}"}), 400
-
-            total_price += product.price * cart_item.quantity
-            order_items.append(OrderItem(
-                product_id=product.id,
-                quantity=cart_item.quantity,
-                unit_price=product.price
-            ))
-            product.stock -= cart_item.quantity
-        Cart.query.filter(Cart.id.in_(cart_item_ids), Cart.user_id == user_id).delete(synchronize_session=False)
+        lines = [(cart_item.product_id, cart_item.quantity) for cart_item in cart_items]
 
     elif direct_items:
+        lines = []
         for item in direct_items:
             product_id = item.get('productId')
             quantity = item.get('quantity')
 
             if not product_id or not quantity:
                 return jsonify({"error": "Missing productId or quantity for direct order"}), 400
+            try:
+                # products are matched by integer id, and clients may send "12"
+                product_id = int(product_id)
+            except (TypeError, ValueError):
+                return jsonify({"error": f"Invalid productId: {product_id}"}), 400
+            if not isinstance(quantity, int) or quantity <= 0:
+                return jsonify({"error": f"Invalid quantity for product ID {product_id}"}), 400
 
-            product = Product.query.filter_by(id=product_id, is_deleted=False).first()
-            if not product:
-                return jsonify({"error": f"Product with ID {product_id} not found"}), 404
+            lines.append((product_id, quantity))
 
-            if quantity > product.stock:
-                return jsonify({"error": f"Insufficient stock for product ID {product_id}"}), 400
+    else:
+        return jsonify({"error": "Either cartItemIds or items must be provided"}), 400
 
-            total_price += product.price * quantity
-            order_items.append(OrderItem(
-                product_id=product.id,
-                quantity=quantity,
-                unit_price=product.price
-            ))
+    new_order, error = _assemble_order(user_id, lines)
+    if error:
+        return error
 
-            product.stock -= quantity
+    if cart_item_ids:
+        Cart.query.filter(Cart.id.in_(cart_item_ids), Cart.user_id == user_id).delete(synchronize_session=False)
+        # the ordered lines leave the cart at the prices the order was charged
+        adjust_cart_summary(user_id, -sum(quantity for _, quantity in lines), -new_order.total_price)
 
-    else:
-        return jsonify({"error": "Either cartItemIds or items must be provided"}), 400
+    db.session.commit()
+    product_cache.invalidate_stock({product_id for product_id, _ in lines})
+    return jsonify({"message": "Order created successfully", "order": _load_order(new_order.id).to_dict()}), 201
+
+
+def _assemble_order(user_id, lines):
+    """Build an order from (product_id, quantity) lines.
+
+    All products are loaded with one IN query, stock is taken with
+    conditional atomic updates, and the order items are written with a
+    single bulk insert, so the number of statements does not grow with the
+    cart size. Returns (order, None) on success or (None, error_response).
+    """
+    product_ids = {product_id for product_id, _ in lines}
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids), Product.is_deleted == False)
+    }
+
+    # sum quantities so a product listed twice is reserved for its combined demand
+    requested = {}
+    total_price = 0
+    for product_id, quantity in lines:
+        product = products.get(product_id)
+        if not product:
+            return None, (jsonify({"error": f"Product with ID {product_id} not found"}), 404)
+
+        requested[product_id] = requested.get(product_id, 0) + quantity
+        total_price += product.price * quantity
+
+    reserved, insufficient = reserve_stock(requested)
+    if not reserved:
+        return None, (jsonify({
+            "error": f"Insufficient stock for product ID {insufficient[0]['productId']}",
+            "insufficient": insufficient
+        }), 400)
 
     new_order = Order(user_id=user_id, total_price=total_price)
     db.session.add(new_order)
     db.session.flush()
 
-    for order_item in order_items:
-        order_item.order_id = new_order.id
-        db.session.add(order_item)
+    db.session.execute(insert(OrderItem), [
+        {
+            "order_id": new_order.id,
+            "product_id": product_id,
+            "quantity": quantity,
+            "unit_price": products[product_id].price
+        }
+        for product_id, quantity in lines
+    ])
+    record_order(new_order, [(product_id, quantity, products[product_id].price) for product_id, quantity in lines])
 
-    db.session.commit()
-    return jsonify({"message": "Order created successfully", "order": new_order.to_dict()}), 201
+    return new_order, None
 
 # get order
 @order_bp.route('/<int:order_id>', methods=['GET'])
+@replica_read
 def get_order(order_id):
-    order = Order.query.filter_by(id=order_id, is_deleted=False).first()
+    try:
+        fields = requested_fields("order_fields", ORDER_FIELDS, relations=("items",))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # ?fields= is a different representation, so it gets its own tag
+    tag = (fields.tag,) if fields else ()
+
+    # a conditional request only needs the version to answer 304
+    if request.if_none_match:
+        version = db.session.execute(
+            db.select(Order.version).filter_by(id=order_id, is_deleted=False)
+        ).scalar()
+        if version is not None and is_not_modified(etag_for(order_id, version, *tag)):
+            return not_modified(etag_for(order_id, version, *tag))
+
+    if fields is None:
+        order = Order.query.options(joinedload(Order.order_items)).filter_by(id=order_id, is_deleted=False).first()
+    else:
+        # only the requested columns (plus the version, for the tag), and items only when included
+        query = Order.query.options(fields.load_only(Order, Order.version))
+        if 'items' in fields.includes:
+            query = query.options(joinedload(Order.order_items))
+        order = query.filter_by(id=order_id, is_deleted=False).first()
     if not order:
         return jsonify({"error": "Order not found"}), 404
 
-    return jsonify(order.to_dict()), 200
+    if fields is None:
+        payload = order.to_dict()
+    elif 'items' in fields.includes:
+        payload = fields.encode(order, [item.to_dict() for item in order.order_items])
+    else:
+        payload = fields.encode(order)
+    return tagged(payload, etag_for(order_id, order.version, *tag))
 
 # update order status
 @order_bp.route('/<int:order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
-    print(f"Request received for order_id: {order_id}")
-    print(f"Request data: {request.get_json()}")
-
     data = request.get_json()
     new_status = data.get('status')
 
@@ -128,10 +218,21 @@ def update_order_status(order_id):
     if not order:
         return jsonify({"error": "Order not found"}), 404
 
+    etag = etag_for(order_id, order.version)
+    if if_match_failed(etag):
+        return precondition_failed(etag)
+
+    record_status_change(order, order.status, new_status)
     order.status = new_status
-    db.session.commit()
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed(etag)
 
-    return jsonify({"message": "Order status updated successfully", "order": order.to_dict()}), 200
+    order = _load_order(order_id)
+    return tagged({"message": "Order status updated successfully", "order": order.to_dict()},
+                  etag_for(order_id, order.version))
 
 # delete order ; logical delete
 @order_bp.route('/<int:order_id>', methods=['DELETE'])
@@ -140,7 +241,13 @@ def delete_order(order_id):
     if not order:
         return jsonify({"error": "Order not found"}), 404
 
+    remove_order(order)
     order.is_deleted = True
     db.session.commit()
 
-    return jsonify({"message": "Order deleted successfully", "order": order.to_dict()}), 200
+    return jsonify({"message": "Order deleted successfully", "order": _load_order(order_id).to_dict()}), 200
+
+
+def _load_order(order_id):
+    # reload an order after commit with its items in the same query
+    return Order.query.options(joinedload(Order.order_items)).populate_existing().filter_by(id=order_id).first()
@@ -1,35 +1,146 @@
-from flask import Blueprint, request, jsonify
-from models.product import Product
+import math
+from functools import partial
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
+from models.product import Product, PRODUCT_FIELDS, PRODUCT_COMPUTED
 from extensions import db
+from utils.stock import set_stock, set_stock_shards
+from utils.pagination import wants_keyset, keyset_paginate
+from utils.search import search_products, search_condition
+from utils.cache import product_cache
+from utils.cart_summary import reprice_cart_summaries, drop_product_from_cart_summaries
+from utils.product_import import import_products, FORMATS
+from utils.etag import etag_for, is_not_modified, if_match_failed, not_modified, precondition_failed, tagged
+from utils.export import export_products
+from utils.decorators import role_required
+from utils.replica import replica_read
+from utils.fields import requested_fields
 
 product_bp = Blueprint('products', __name__)
 
 @product_bp.route('/all', methods=['GET'])
+@replica_read
 def get_all_products():
+    # list pages are cached as id lists keyed by their query string
+    try:
+        fields = requested_fields("product_fields", PRODUCT_FIELDS, computed=PRODUCT_COMPUTED)
+        product_ids, meta = product_cache.get_list(tuple(sorted(request.args.items(multi=True))),
+                                                   partial(_load_product_page, fields))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    products = product_cache.get_many(product_ids, fields)
+    return jsonify({
+        "products": [products[product_id] for product_id in product_ids if product_id in products],
+        **meta
+    }), 200
+
+
+def _load_product_page(fields):
+    # with ?fields= the page query reads ids only; get_many() loads the requested columns
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search', '', type=str)
+    ids_only = (load_only(Product.id),) if fields else ()
+
+    if wants_keyset():
+        query = db.select(Product).where(Product.is_deleted == False).options(*ids_only)
+        if search:
+            query = query.where(search_condition(search))
+        keyset = keyset_paginate(query, {"id": Product.id, "price": Product.price, "name": Product.name}, Product.id)
+        return _cached_ids(keyset.items, prime=not fields), keyset.meta()
 
-    query = Product.query.filter(Product.is_deleted == False)
     if search:
-        query = query.filter(Product.name.contains(search))
+        products, total = search_products(search, page, per_page)
+        return _cached_ids(products), {
+            "total": total,
+            "pages": math.ceil(total / per_page) if per_page > 0 else 0,
+            "current_page": page
+        }
 
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    products = [product.to_dict() for product in pagination.items]
+    query = Product.query.filter(Product.is_deleted == False).options(*ids_only)
 
-    return jsonify({
-        "products": products,
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    return _cached_ids(pagination.items, prime=not fields), {
         "total": pagination.total,
         "pages": pagination.pages,
         "current_page": pagination.page
-    }), 200
+    }
+
+
+def _cached_ids(products, prime=True):
+    if prime:
+        for product in products:
+            product_cache.prime(product)
+    return [product.id for product in products]
+
+# streaming export (admin only): ?format=ndjson|csv
+@product_bp.route('/export', methods=['GET'])
+@replica_read
+@role_required('admin')
+def export_products_route():
+    try:
+        return export_products()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @product_bp.route('/<int:product_id>', methods=['GET'])
+@replica_read
 def get_product(product_id):
-    product = Product.query.filter_by(id=product_id, is_deleted=False).first()
+    try:
+        fields = requested_fields("product_fields", PRODUCT_FIELDS, computed=PRODUCT_COMPUTED)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    product, version = product_cache.get_versioned(product_id)
     if not product:
         return jsonify({"error": "Product not found"}), 404
-    return jsonify(product.to_dict()), 200
+
+    # stock is part of the tag because reservations change it without a version bump
+    etag = etag_for(product_id, version, product["productStock"])
+    if fields:
+        # a single product is served from the cache, so ?fields= only trims the response
+        product = fields.project(product)
+        etag = etag_for(etag, fields.tag)
+    if is_not_modified(etag):
+        return not_modified(etag)
+    return tagged(product, etag)
+
+# multi-get: GET ?ids=1,2,3 or POST {"ids": [1, 2, 3]}; ?fields= applies as on /all
+@product_bp.route('/batch', methods=['GET', 'POST'])
+@replica_read
+def get_products_batch():
+    if request.method == 'POST':
+        ids = (request.get_json(silent=True) or {}).get('ids')
+    else:
+        ids = [part for part in request.args.get('ids', '').split(',') if part.strip()]
+    try:
+        if not isinstance(ids, list) or not ids:
+            raise ValueError("ids must be a non-empty list of product ids")
+        # duplicates are answered once, in the position of their first occurrence
+        product_ids = list(dict.fromkeys(int(product_id) for product_id in ids))
+    except (TypeError, ValueError):
+        return jsonify({"error": "ids must be a non-empty list of product ids"}), 400
+
+    limit = current_app.config['PRODUCT_BATCH_MAX_IDS']
+    if len(product_ids) > limit:
+        return jsonify({"error": f"At most {limit} ids per request"}), 400
+    try:
+        fields = requested_fields("product_fields", PRODUCT_FIELDS, computed=PRODUCT_COMPUTED)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # cached products cost nothing; the rest come from a single IN query
+    products = product_cache.get_many(product_ids, fields)
+    return jsonify({
+        "products": [products[product_id] for product_id in product_ids if product_id in products],
+        # ids that do not exist or are deleted
+        "missing": [product_id for product_id in product_ids if product_id not in products]
+    }), 200
+
+@product_bp.route('/cache/stats', methods=['GET'])
+def product_cache_stats():
+    return jsonify(product_cache.stats()), 200
 
 @product_bp.route('/add', methods=['POST'])
 def add_product():
@@ -45,10 +156,30 @@ def add_product():
     )
     db.session.add(new_product)
     db.session.commit()
+    product_cache.invalidate([new_product.id])
 
     return jsonify({"message": "Product added successfully", "product": new_product.to_dict()}), 201
 
 
+# bulk import: NDJSON or CSV streamed in the request body
+@product_bp.route('/import', methods=['POST'])
+@role_required('admin')
+def import_products_route():
+    fmt = request.args.get('format') or ('csv' if request.mimetype == 'text/csv' else 'ndjson')
+    mode = request.args.get('mode', 'insert')
+    batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+
+    if fmt not in FORMATS:
+        return jsonify({"error": f"Unsupported format: {fmt}"}), 400
+    if mode not in ('insert', 'upsert'):
+        return jsonify({"error": f"Unsupported mode: {mode}"}), 400
+    if batch_size < 1:
+        return jsonify({"error": "batch_size must be positive"}), 400
+
+    report = import_products(request.stream, fmt, mode, batch_size, current_app.config['IMPORT_MAX_REPORTED_ERRORS'])
+    return jsonify({"message": "Import finished", **report.to_dict()}), 200
+
+
 @product_bp.route('/<int:product_id>', methods=['PUT'])
 def update_product(product_id):
     data = request.get_json()
@@ -56,17 +187,47 @@ def update_product(product_id):
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
+    etag = etag_for(product_id, product.version, product.available_stock)
+    if if_match_failed(etag):
+        return precondition_failed(etag)
+
+    max_shards = current_app.config['PRODUCT_MAX_STOCK_SHARDS']
+    if 'stockShards' in data and not _is_int_between(data['stockShards'], 0, max_shards):
+        return jsonify({"error": f"stockShards must be an integer from 0 to {max_shards}"}), 400
+    if 'price' in data and not _is_price(data['price']):
+        return jsonify({"error": "price must be a positive number"}), 400
+
     if 'name' in data:
         product.name = data['name']
     if 'description' in data:
         product.description = data['description']
-    if 'price' in data:
+    if 'price' in data and data['price'] != product.price:
+        reprice_cart_summaries(product_id, data['price'] - product.price)
         product.price = data['price']
+    if 'stockShards' in data:
+        set_stock_shards(product, data['stockShards'])
     if 'stock' in data:
-        product.stock = data['stock']
+        set_stock(product, data['stock'])
 
-    db.session.commit()
-    return jsonify({"message": "Product updated successfully", "product": product.to_dict()}), 200
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed(etag)
+    product_cache.invalidate([product_id])
+
+    product_data = product.to_dict()
+    return tagged({"message": "Product updated successfully", "product": product_data},
+                  etag_for(product_id, product.version, product_data["productStock"]))
+
+
+def _is_int_between(value, low, high):
+    # bool is an int subclass, but true/false are not counts
+    return isinstance(value, int) and not isinstance(value, bool) and low <= value <= high
+
+
+def _is_price(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) and value > 0
 
 # delete product(logical delete)
 
@@ -76,8 +237,10 @@ def delete_product(product_id):
     if not product:
         return jsonify({"error": "Product not found"}), 404
     product.is_deleted = True
+    drop_product_from_cart_summaries(product_id, product.price)
     try:
         db.session.commit()
+        product_cache.invalidate([product_id])
         return jsonify({"message": "Product deleted successfully"}), 200
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify, send_file
+from utils.decorators import role_required
+from utils.profiling import request_profiler
+
+profile_bp = Blueprint('profiles', __name__)
+
+# captured request profiles; pass X-Profile: 1 as an admin to capture one
+
+
+# list captures, newest first: ?endpoint=&limit=50
+@profile_bp.route('', methods=['GET'])
+@role_required('admin')
+def list_profiles():
+    endpoint = request.args.get('endpoint')
+    limit = request.args.get('limit', 50, type=int)
+    captures = [capture for capture in request_profiler.list() if not endpoint or capture["endpoint"] == endpoint]
+    return jsonify({"profiles": captures[:max(limit, 0)]}), 200
+
+
+# the pstats file, for snakeviz or python -m pstats
+@profile_bp.route('/<profile_id>', methods=['GET'])
+@role_required('admin')
+def download_profile(profile_id):
+    path = request_profiler.path(profile_id, '.prof')
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                     download_name=f"{profile_id}.prof")
+
+
+# endpoint, timings and the SQL statements the request ran
+@profile_bp.route('/<profile_id>/sql', methods=['GET'])
+@role_required('admin')
+def profile_sql(profile_id):
+    path = request_profiler.path(profile_id, '.json')
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, mimetype='application/json')
@@ -0,0 +1,59 @@
+from datetime import date
+from flask import Blueprint, request, jsonify
+from utils.decorators import role_required
+from utils.sales import top_products, revenue_series, status_funnel
+
+report_bp = Blueprint('reports', __name__)
+
+# every report reads only the daily rollup tables; from/to are inclusive ISO dates
+
+
+# best-selling products: ?from=&to=&limit=10&by=revenue|units
+@report_bp.route('/top-products', methods=['GET'])
+@role_required('admin')
+def top_products_report():
+    by = request.args.get('by', 'revenue')
+    limit = request.args.get('limit', 10, type=int)
+    if by not in ('revenue', 'units') or not 0 < limit <= 100:
+        return jsonify({"error": "by must be revenue or units and limit between 1 and 100"}), 400
+    try:
+        date_from, date_to = _date_range()
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+
+    return jsonify({"products": top_products(date_from, date_to, limit, by)}), 200
+
+
+# revenue and units over time: ?from=&to=&interval=day|month
+@report_bp.route('/revenue', methods=['GET'])
+@role_required('admin')
+def revenue_report():
+    interval = request.args.get('interval', 'day')
+    if interval not in ('day', 'month'):
+        return jsonify({"error": "interval must be day or month"}), 400
+    try:
+        date_from, date_to = _date_range()
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+
+    return jsonify({"interval": interval, "series": revenue_series(date_from, date_to, interval)}), 200
+
+
+# orders per status for orders created in the range: ?from=&to=
+@report_bp.route('/status-funnel', methods=['GET'])
+@role_required('admin')
+def status_funnel_report():
+    try:
+        date_from, date_to = _date_range()
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+
+    return jsonify({"funnel": status_funnel(date_from, date_to)}), 200
+
+
+def _date_range():
+    bounds = []
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        bounds.append(date.fromisoformat(value) if value else None)
+    return bounds
@@ -2,6 +2,12 @@ from models.shoppingCart import Cart
 from flask import Blueprint, request, jsonify
 from models.product import Product
 from extensions import db
+from sqlalchemy import update, delete
+from utils.stock import reserve_stock, stock_levels
+from utils.cache import product_cache
+from utils.cart_summary import get_cart_summary, adjust_cart_summary, reset_cart_summary
+from utils.replica import replica_read
+from utils.upsert import upsert_add
 
 cart_bp = Blueprint('cart', __name__)
 
@@ -14,55 +20,70 @@ def add_to_cart():
 
     if not user_id or not product_id or not quantity:
         return jsonify({"error": "Missing required fields"}), 400
+    # a negative reservation would pass the stock >= quantity check and add stock
+    if not isinstance(quantity, int) or quantity <= 0:
+        return jsonify({"error": "Invalid quantity"}), 400
 
     # 检查产品是否存在
     product = Product.query.filter_by(id=product_id, is_deleted=False).first()
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
-    if product.stock < quantity:
+    available = product.available_stock
+    if available < quantity:
         return jsonify({"error": "Insufficient stock"}), 400
 
     cart_item = Cart.query.filter_by(user_id=user_id, product_id=product_id).first()
-    if cart_item:
-        if cart_item.quantity + quantity > product.stock:
-            return jsonify({"error": f"Insufficient stock. Available stock: {product.stock - cart_item.quantity}"}), 400
+    if cart_item and cart_item.quantity + quantity > available:
+        return jsonify({"error": f"Insufficient stock. Available stock: {available - cart_item.quantity}"}), 400
 
-        cart_item.quantity += quantity
-    else:
-        cart_item = Cart(user_id=user_id, product_id=product_id, quantity=quantity)
-        db.session.add(cart_item)
-
-    product.stock -= quantity
+    # the checks above are advisory; the conditional decrement is what prevents overselling
+    reserved, insufficient = reserve_stock({product_id: quantity})
+    if not reserved:
+        return jsonify({"error": "Insufficient stock", "insufficient": insufficient}), 400
 
+    # insert the line or add to it in one statement, so concurrent adds cannot create two lines
+    upsert_add(Cart, ('user_id', 'product_id'), [{"user_id": user_id, "product_id": product_id, "quantity": quantity}])
+    adjust_cart_summary(user_id, quantity, product.price * quantity)
     db.session.commit()
+    product_cache.invalidate_stock([product_id])
     return jsonify({"message": "Product added to cart successfully"}), 201
 
 # get cart
 @cart_bp.route('/<int:user_id>', methods=['GET'])
+@replica_read
 def get_cart(user_id):
-    cart_items = Cart.query.filter_by(user_id=user_id).all()
-    if not cart_items:
+    # one outer join: cart rows whose product is gone come back with no product columns
+    rows = db.session.execute(
+        db.select(Cart.quantity, Product.id, Product.name, Product.price)
+        .outerjoin(Product, db.and_(Product.id == Cart.product_id, Product.is_deleted == False))
+        .where(Cart.user_id == user_id)
+    ).all()
+    if not rows:
         return jsonify({"message": "Cart is empty"}), 200
 
     cart_data = []
     total_price = 0
 
-    for item in cart_items:
-        product = Product.query.filter_by(id=item.product_id, is_deleted=False).first()
-        if product:
+    for quantity, product_id, name, price in rows:
+        if product_id:
             item_data = {
-                "productId": product.id,
-                "productName": product.name,
-                "unitPrice": product.price,
-                "quantity": item.quantity,
-                "totalPrice": product.price * item.quantity
+                "productId": product_id,
+                "productName": name,
+                "unitPrice": price,
+                "quantity": quantity,
+                "totalPrice": price * quantity
             }
-            total_price += product.price * item.quantity
+            total_price += price * quantity
             cart_data.append(item_data)
 
     return jsonify({"cart": cart_data, "totalPrice": total_price}), 200
 
+# cart badge: item count and total from the maintained summary row
+@cart_bp.route('/<int:user_id>/summary', methods=['GET'])
+def get_cart_summary_route(user_id):
+    return jsonify(get_cart_summary(user_id)), 200
+
 # update cart
 @cart_bp.route('/update', methods=['PUT'])
 def update_cart():
@@ -73,6 +94,8 @@ def update_cart():
 
     if not user_id or not product_id or not quantity:
         return jsonify({"error": "Missing required fields"}), 400
+    if not isinstance(quantity, int) or quantity <= 0:
+        return jsonify({"error": "Invalid quantity"}), 400
 
     cart_item = Cart.query.filter_by(user_id=user_id, product_id=product_id).first()
     if not cart_item:
@@ -82,10 +105,13 @@ def update_cart():
     if not product:
         return jsonify({"error": "Product not found"}), 404
 
-    if product.stock < quantity:
+    # sharded products keep their stock in the shard rows, not on the product row
+    if product.available_stock < quantity:
         return jsonify({"error": "Insufficient stock"}), 400
 
+    delta = quantity - cart_item.quantity
     cart_item.quantity = quantity
+    adjust_cart_summary(user_id, delta, product.price * delta)
     db.session.commit()
     return jsonify({"message": "Cart updated successfully"}), 200
 
@@ -103,23 +129,141 @@ def delete_from_cart():
     if not cart_item:
         return jsonify({"error": "Cart item not found"}), 404
 
+    # lines of deleted products were already taken out of the summary
+    price = db.session.execute(
+        db.select(Product.price).filter_by(id=product_id, is_deleted=False)
+    ).scalar()
     db.session.delete(cart_item)
+    if price is not None:
+        adjust_cart_summary(user_id, -cart_item.quantity, -price * cart_item.quantity)
     db.session.commit()
     return jsonify({"message": "Product removed from cart successfully"}), 200
 
 # clear cart
 @cart_bp.route('/clear/<int:user_id>', methods=['DELETE'])
 def clear_cart(user_id):
-    cart_items = Cart.query.filter_by(user_id=user_id).all()
-    if not cart_items:
+    deleted = Cart.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    if not deleted:
         return jsonify({"message": "Cart is already empty"}), 200
 
-    for item in cart_items:
-        db.session.delete(item)
-
+    reset_cart_summary(user_id)
     db.session.commit()
     return jsonify({"message": "Cart cleared successfully"}), 200
 
+# apply many add/update/remove operations in one request and one transaction
+@cart_bp.route('/batch', methods=['POST'])
+def batch_cart():
+    data = request.get_json()
+    user_id = data.get('userId')
+    operations = data.get('operations')
+
+    if not user_id or not isinstance(operations, list) or not operations:
+        return jsonify({"error": "Missing userId or operations"}), 400
+
+    product_ids = {op.get('productId') for op in operations if isinstance(op, dict) and op.get('productId')}
+    products = {
+        product.id: product
+        for product in Product.query.filter(Product.id.in_(product_ids), Product.is_deleted == False)
+    }
+    # plain values, not ORM objects: a failed reservation rolls back and would expire them
+    prices = {product_id: product.price for product_id, product in products.items()}
+    existing = {}
+    for item in Cart.query.filter(Cart.user_id == user_id, Cart.product_id.in_(product_ids)).order_by(Cart.id):
+        existing.setdefault(item.product_id, (item.id, item.quantity))
+
+    # first pass: validate, and collect the adds in request order
+    results = []
+    adds = []
+    for index, op in enumerate(operations):
+        result = {"index": index, "status": "ok"}
+        if isinstance(op, dict):
+            result.update(op=op.get('op'), productId=op.get('productId'))
+        results.append(result)
+
+        error = _validate_cart_op(op, products)
+        if error:
+            result.update(status="error", error=error)
+        elif op['op'] == 'add':
+            adds.append((op, result))
+
+    # give each add the stock left by the adds before it, so only the adds that do not
+    # fit fail; then reserve the accepted ones together, re-planning if stock moved meanwhile
+    additions = {}
+    while adds:
+        levels = stock_levels({op['productId'] for op, _ in adds})
+        additions = {}
+        for op, result in adds:
+            taken = additions.get(op['productId'], 0)
+            if taken + op['quantity'] > levels.get(op['productId'], 0):
+                result.update(status="error", error="Insufficient stock")
+            else:
+                additions[op['productId']] = taken + op['quantity']
+        adds = [(op, result) for op, result in adds if result["status"] == "ok"]
+        if not additions or reserve_stock(additions)[0]:
+            break
+
+    # second pass: replay the valid operations in order against the in-memory cart
+    quantities = {product_id: quantity for product_id, (_, quantity) in existing.items()}
+    for op, result in zip(operations, results):
+        if result["status"] != "ok":
+            continue
+        product_id = op['productId']
+        current = quantities.get(product_id)
+        if op['op'] == 'add':
+            quantities[product_id] = (current or 0) + op['quantity']
+        elif current is None:
+            result.update(status="error", error="Cart item not found")
+        elif op['op'] == 'update':
+            quantities[product_id] = op['quantity']
+        else:
+            quantities[product_id] = None
+
+    inserts, updates, deletes = [], [], []
+    quantity_delta = price_delta = 0
+    for product_id, quantity in quantities.items():
+        cart_id, before = existing.get(product_id, (None, 0))
+        if cart_id and quantity is None:
+            deletes.append(cart_id)
+        elif cart_id and quantity != before:
+            updates.append({"id": cart_id, "quantity": quantity})
+        elif not cart_id and quantity is not None:
+            inserts.append({"user_id": user_id, "product_id": product_id, "quantity": quantity})
+        # lines of deleted products are not part of the summary
+        if product_id in prices:
+            quantity_delta += (quantity or 0) - before
+            price_delta += prices[product_id] * ((quantity or 0) - before)
+
+    if inserts:
+        # a line a concurrent request created meanwhile is added to rather than duplicated
+        upsert_add(Cart, ('user_id', 'product_id'), inserts)
+    if updates:
+        db.session.execute(update(Cart), updates)
+    if deletes:
+        db.session.execute(delete(Cart).where(Cart.id.in_(deletes)))
+    adjust_cart_summary(user_id, quantity_delta, price_delta)
+
+    db.session.commit()
+    product_cache.invalidate_stock(list(additions))
+
+    failed = sum(1 for result in results if result["status"] != "ok")
+    return jsonify({"results": results, "applied": len(results) - failed, "failed": failed}), 200
+
+
+def _validate_cart_op(op, products):
+    if not isinstance(op, dict) or op.get('op') not in ('add', 'update', 'remove'):
+        return "Unknown operation"
+    if not op.get('productId'):
+        return "Missing productId"
+    if op['op'] != 'remove':
+        if not isinstance(op.get('quantity'), int) or op['quantity'] <= 0:
+            return "Missing or invalid quantity"
+        product = products.get(op['productId'])
+        if not product:
+            return "Product not found"
+        if op['op'] == 'update' and product.available_stock < op['quantity']:
+            return "Insufficient stock"
+    return None
+
 @cart_bp.route('/select-items', methods=['POST'])
 def select_cart_items():
     data = request.get_json()
@@ -1,44 +1,104 @@
 from flask import Blueprint, request, jsonify
-from models.user import User
+from models.user import User, USER_FIELDS
 from extensions import db
 from sqlalchemy.exc import IntegrityError
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy.orm.exc import StaleDataError
+from utils.passwords import password_hasher, HashingBusy
+from flask_jwt_extended import jwt_required
+from utils.pagination import wants_keyset, keyset_paginate
+from utils.etag import etag_for, is_not_modified, if_match_failed, not_modified, precondition_failed, tagged
+from utils.export import export_users
+from utils.decorators import role_required, current_principal
+from utils.replica import replica_read
+from utils.fields import requested_fields
 
 user_bp = Blueprint('users', __name__)
 
 # get all users
 @user_bp.route('/all', methods=['GET'])
+@replica_read
 def get_all_users():
-    users = User.query.filter_by(is_deleted=False).all()
-    return {"users": [user.to_dict() for user in users]}, 200
+    try:
+        fields = requested_fields("user_fields", USER_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query = User.query.filter_by(is_deleted=False)
+    if fields:
+        query = query.options(fields.load_only(User))
+    encode = fields.encode if fields else User.to_dict
+    return {"users": [encode(user) for user in query.all()]}, 200
 
 # get all users with pagination
 @user_bp.route('/', methods=['GET'])
+@replica_read
 def list_users():
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 10, type=int)
     search = request.args.get('search', '', type=str)
+    try:
+        fields = requested_fields("user_fields", USER_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    encode = fields.encode if fields else User.to_dict
+
+    if wants_keyset():
+        query = db.select(User).where(User.is_deleted == False)
+        if search:
+            query = query.where(User.username.contains(search))
+        if fields:
+            query = query.options(fields.load_only(User))
+        try:
+            keyset = keyset_paginate(query, {"id": User.id, "username": User.username}, User.id)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"users": [encode(user) for user in keyset.items], **keyset.meta()}), 200
 
     query = User.query.filter(User.is_deleted == False)
     if search:
         query = query.filter(User.username.contains(search))
+    if fields:
+        query = query.options(fields.load_only(User))
 
     pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     return jsonify({
-        "users": [user.to_dict() for user in pagination.items],
+        "users": [encode(user) for user in pagination.items],
         "total": pagination.total,
         "pages": pagination.pages,
         "current_page": pagination.page
     }), 200
 
+# streaming export (admin only): ?format=ndjson|csv
+@user_bp.route('/export', methods=['GET'])
+@replica_read
+@role_required('admin')
+def export_users_route():
+    try:
+        return export_users()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
 # get user by id
 @user_bp.route('/<int:user_id>', methods=['GET'])
+@replica_read
 def get_user(user_id):
-    user = User.query.filter_by(id=user_id, is_deleted=False).first()
+    try:
+        fields = requested_fields("user_fields", USER_FIELDS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = User.query.filter_by(id=user_id, is_deleted=False)
+    if fields:
+        # the version is loaded too, for the tag
+        query = query.options(fields.load_only(User, User.version))
+    user = query.first()
     if not user:
         return jsonify({"error": "User not found"}), 404
-    return jsonify(user.to_dict()), 200
+
+    # ?fields= is a different representation, so it gets its own tag
+    etag = etag_for(user_id, user.version, fields.tag) if fields else etag_for(user_id, user.version)
+    if is_not_modified(etag):
+        return not_modified(etag)
+    return tagged(fields.encode(user) if fields else user.to_dict(), etag)
 
 
 @user_bp.route('/add', methods=['POST'])
@@ -49,7 +109,10 @@ def add_user():
     if not all(k in data for k in ("username", "email", "password")):
         return {"error": "Missing username, email, or password"}, 400
 
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+    try:
+        hashed_password = password_hasher.hash(data['password'])
+    except HashingBusy:
+        return {"error": "Server is busy, please retry"}, 503
 
     new_user = User(
         username=data['username'],
@@ -84,41 +147,30 @@ def delete_user(user_id):
 @user_bp.route('/<int:user_id>', methods=['PUT'])
 @jwt_required()
 def update_user(user_id):
-    current_user = get_jwt_identity()
-    print("JWT Identity:", current_user)
-    if current_user["id"] != user_id:
+    if current_principal().id != user_id:
         return jsonify({"error": "Permission denied"}), 403
     data = request.get_json()
     user = User.query.filter_by(id=user_id, is_deleted=False).first()
     if not user:
         return jsonify({"error": "User not found"}), 404
 
+    etag = etag_for(user_id, user.version)
+    if if_match_failed(etag):
+        return precondition_failed(etag)
+
     if 'username' in data:
         user.username = data['username']
     if 'email' in data:
         user.email = data['email']
     if 'password' in data:
-        user.password = generate_password_hash(data['password'], method='pbkdf2:sha256')
+        try:
+            user.password = password_hasher.hash(data['password'])
+        except HashingBusy:
+            return jsonify({"error": "Server is busy, please retry"}), 503
 
-    db.session.commit()
-    return jsonify({"message": "User updated successfully", "user": user.to_dict()}), 200
-
-# # user login
-# @user_bp.route('/login', methods=['POST'])
-# def login():
-#     data = request.get_json()
-
-#     if not all(k in data for k in ("email", "password")):
-#         return jsonify({"error": "Missing email or password"}), 400
-
-#     user = User.query.filter_by(email=data['email'], is_deleted=False).first()
-#     if not user:
-#         return jsonify({"error": "User not found"}), 404
-
-#     if not check_password_hash(user.password, data['password']):
-#         return jsonify({"error": "Invalid password"}), 401
-
-#     return jsonify({
-#         "message": "Login successful",
-#         "user": user.to_dict()
-#     }), 200
+    try:
+        db.session.commit()
+    except StaleDataError:
+        db.session.rollback()
+        return precondition_failed(etag)
+    return tagged({"message": "User updated successfully", "user": user.to_dict()}, etag_for(user_id, user.version))
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def make_app(tmp_path_factory):
+    """Return a factory building the app on a fresh SQLite file with its tables created.
+
+    Keyword arguments override Config attributes for that app only. Passwords
+    are hashed inline, since a process pool is not worth starting for a few
+    test logins.
+    """
+    def make(**overrides):
+        from app import create_app
+        from extensions import db
+
+        overrides.setdefault('SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path_factory.mktemp('db') / 'test.db'}")
+        overrides.setdefault('PASSWORD_HASH_WORKERS', 0)
+        with pytest.MonkeyPatch.context() as patch:
+            for name, value in overrides.items():
+                patch.setattr(Config, name, value)
+            app = create_app()
+        with app.app_context():
+            db.create_all()
+        return app
+    return make
@@ -0,0 +1,150 @@
+"""EXPLAIN QUERY PLAN check of every statement the endpoints run, on SQLite.
+
+Calls each blueprint's endpoints through the test client against a seeded
+database and fails when any SELECT, UPDATE or DELETE they issued reads a
+table with a full scan, so a schema or query change that loses an index
+fails the test run.
+"""
+import re
+
+import pytest
+
+# full scans that are the point of the endpoint: rollup reports without a date
+# range read the whole (small, pre-aggregated) rollup table
+ALLOWED_SCANS = {
+    ('GET', '/reports/top-products'): {'product_sales_daily'},
+    ('GET', '/reports/revenue?interval=month'): {'product_sales_daily'},
+    ('GET', '/reports/status-funnel'): {'order_status_daily'},
+}
+
+# (method, url, json body, who is logged in); run in this order against one
+# database, so later calls see what earlier ones wrote; user 2 is user1@example.com
+CALLS = [
+    ('GET', '/products/all', None, None),
+    ('GET', '/products/all?page=3&per_page=20', None, None),
+    ('GET', '/products/all?limit=20', None, None),
+    ('GET', '/products/all?limit=20&sort=price', None, None),
+    ('GET', '/products/all?limit=20&sort=name', None, None),
+    ('GET', '/products/all?search=jade', None, None),
+    ('GET', '/products/5', None, None),
+    ('GET', '/products/batch?ids=9,3,4,99999', None, None),
+    ('POST', '/products/batch?fields=productName,productPrice', {"ids": [11, 12]}, None),
+    ('PUT', '/products/5', {"price": 12.5}, 'admin'),
+    ('GET', '/products/export', None, 'admin'),
+    ('GET', '/orders/all', None, None),
+    ('GET', '/orders/all?userId=2', None, None),
+    ('GET', '/orders/all?limit=10&userId=2', None, None),
+    ('GET', '/orders/3', None, None),
+    ('POST', '/orders/create', {"userId": 2, "current_items": [{"productId": 7, "quantity": 1}]}, None),
+    ('POST', '/orders/create', {"userId": 2, "cartItemIds": [1]}, None),
+    ('PUT', '/orders/3/status', {"status": "paid"}, None),
+    ('DELETE', '/orders/4', None, None),
+    ('GET', '/orders/export?userId=2', None, 'admin'),
+    ('GET', '/users/all', None, None),
+    ('GET', '/users/', None, None),
+    ('GET', '/users/?limit=10', None, None),
+    ('GET', '/users/3', None, None),
+    ('GET', '/users/export', None, 'admin'),
+    ('POST', '/cart/add', {"userId": 3, "productId": 9, "quantity": 1}, None),
+    ('GET', '/cart/3', None, None),
+    ('GET', '/cart/3/summary', None, None),
+    ('PUT', '/cart/update', {"userId": 3, "productId": 9, "quantity": 2}, None),
+    ('POST', '/cart/batch', {"userId": 3, "operations": [{"op": "add", "productId": 10, "quantity": 1},
+                                                         {"op": "remove", "productId": 9}]}, None),
+    ('POST', '/cart/select-items', {"userId": 4, "cartItemIds": [3]}, None),
+    ('DELETE', '/cart/delete', {"userId": 3, "productId": 10}, None),
+    ('DELETE', '/cart/clear/5', None, None),
+    ('DELETE', '/products/6', None, 'admin'),
+    ('GET', '/auth/admin-only', None, 'admin'),
+    ('GET', '/reports/top-products', None, 'admin'),
+    ('GET', '/reports/top-products?from=2020-01-01&to=2100-01-01', None, 'admin'),
+    ('GET', '/reports/revenue?interval=month', None, 'admin'),
+    ('GET', '/reports/status-funnel', None, 'admin'),
+    ('POST', '/auth/logout', None, 'customer'),
+]
+
+_SCAN = re.compile(r'^SCAN (\w+)$')
+
+
+@pytest.fixture(scope='module')
+def plans(make_app):
+    from sqlalchemy import event
+    from extensions import db
+    from utils.search import create_search_index
+
+    # caching off, so every call reaches the database
+    app = make_app(PRODUCT_CACHE_TTL=0, PRODUCT_LIST_CACHE_TTL=0)
+    with app.app_context():
+        create_search_index()
+        _seed()
+
+    statements = []
+    with app.app_context():
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def capture(connection, cursor, statement, parameters, context, executemany):
+            if not executemany and re.match(r'\s*(SELECT|UPDATE|DELETE|WITH)', statement, re.I):
+                statements.append((statement, parameters))
+
+    client = app.test_client()
+    headers = {"admin": _login(client, "admin@example.com"), "customer": _login(client, "user1@example.com")}
+
+    def run(method, url, body, user):
+        # returns (HTTP status, [(statement, plan lines, tables scanned)])
+        statements.clear()
+        response = client.open(url, method=method, json=body, headers=headers.get(user))
+        response.get_data()
+        with app.app_context():
+            tables = set(db.metadata.tables)
+            connection = db.engine.raw_connection()
+            try:
+                checked = []
+                for statement, parameters in list(statements):
+                    plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                    scans = {match.group(1) for match in map(_SCAN.match, plan) if match} & tables
+                    checked.append((statement, plan, scans))
+                return response.status_code, checked
+            finally:
+                connection.close()
+    return run
+
+
+@pytest.mark.parametrize('method, url, body, user', CALLS, ids=[f"{method} {url}" for method, url, *_ in CALLS])
+def test_no_full_scans(plans, method, url, body, user):
+    status, checked = plans(method, url, body, user)
+    assert status < 500
+
+    allowed = ALLOWED_SCANS.get((method, url), set())
+    failures = [
+        f"full scan of {', '.join(sorted(scans - allowed))}: {' '.join(statement.split())}\n    " + "\n    ".join(plan)
+        for statement, plan, scans in checked if scans - allowed
+    ]
+    assert not failures, "\n".join(failures)
+
+
+def _seed():
+    from extensions import db
+    from models.order import Order, OrderItem
+    from models.product import Product
+    from models.shoppingCart import Cart
+    from models.user import User
+    from utils.passwords import password_hasher
+
+    password = password_hasher.hash("secret")
+    db.session.add(User(username="admin", email="admin@example.com", password=password, role="admin"))
+    for i in range(1, 21):
+        db.session.add(User(username=f"user{i}", email=f"user{i}@example.com", password=password))
+    for i in range(1, 201):
+        db.session.add(Product(name=f"jade bangle {i}", description="green jade", price=10.0 + i, stock=100))
+    db.session.flush()
+    for i in range(1, 21):
+        db.session.add(Cart(user_id=i + 1, product_id=i, quantity=1))
+        order = Order(user_id=i + 1, total_price=10.0 + i)
+        db.session.add(order)
+        db.session.flush()
+        db.session.add(OrderItem(order_id=order.id, product_id=i, quantity=1, unit_price=10.0 + i))
+    db.session.commit()
+
+
+def _login(client, email):
+    token = client.post('/auth/login', json={"email": email, "password": "secret"}).get_json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
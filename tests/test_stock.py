@@ -0,0 +1,52 @@
+"""Zero-oversell check of the stock reservations under concurrent threads, on SQLite."""
+import threading
+
+import pytest
+
+THREADS = 4
+STOCK = 120
+
+
+@pytest.mark.parametrize('shards', [0, 4], ids=['single-row', 'sharded'])
+@pytest.mark.parametrize('quantity', [1, 7])
+def test_concurrent_reservations_never_oversell(make_app, shards, quantity):
+    from sqlalchemy.exc import OperationalError
+    from extensions import db
+    from models.product import Product
+    from utils.stock import reserve_stock, set_stock_shards, stock_levels
+
+    app = make_app()
+    with app.app_context():
+        product = Product(name="hot item", price=1.0, stock=STOCK)
+        db.session.add(product)
+        db.session.flush()
+        if shards:
+            set_stock_shards(product, shards)
+        db.session.commit()
+        product_id = product.id
+
+    reserved = [0] * THREADS
+
+    def worker(index):
+        with app.app_context():
+            while True:
+                try:
+                    ok, _ = reserve_stock({product_id: quantity})
+                    if not ok:
+                        return
+                    db.session.commit()
+                    reserved[index] += 1
+                except OperationalError:
+                    # SQLite allows a single writer; a busy database is retried, not counted
+                    db.session.rollback()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        remaining = stock_levels([product_id])[product_id]
+    assert remaining >= 0
+    assert sum(reserved) * quantity + remaining == STOCK
@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy.orm import selectinload
+from models.product import Product
+from utils.stock import stock_levels
+from utils.replica import on_primary
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache whose entries also expire after ttl seconds."""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
+
+
+class ProductCache:
+    """Read-through cache of serialized products and product list pages.
+
+    Catalog fields are cached per product id, list pages are cached as id
+    lists keyed by their query arguments, and stock is kept in its own cache
+    with a much shorter TTL (0 re-reads it on every request), so a stock
+    change never invalidates the rest of the catalog. The cache is per
+    process: invalidation reaches only the worker that made the change, and
+    other workers catch up within the TTLs. Misses are always filled from
+    the primary, also in replica_read endpoints, so replica lag never gets
+    cached.
+    """
+
+    def __init__(self, app=None):
+        self.products = LRUCache(0, 0)
+        self.stock = LRUCache(0, 0)
+        self.lists = LRUCache(0, 0)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.products = LRUCache(app.config['PRODUCT_CACHE_SIZE'], app.config['PRODUCT_CACHE_TTL'])
+        self.stock = LRUCache(app.config['PRODUCT_CACHE_SIZE'], app.config['PRODUCT_STOCK_TTL'])
+        self.lists = LRUCache(app.config['PRODUCT_LIST_CACHE_SIZE'], app.config['PRODUCT_LIST_CACHE_TTL'])
+        app.extensions['product_cache'] = self
+
+    def get(self, product_id):
+        return self.get_many([product_id]).get(product_id)
+
+    def get_versioned(self, product_id):
+        # (product dict, row version) or (None, None), for building ETags
+        return self._load([product_id]).get(product_id, (None, None))
+
+    def get_many(self, product_ids, fields=None):
+        # returns {id: product dict} for the products that exist and are not deleted;
+        # with a FieldSet, only its keys, and products not cached are loaded with only its columns
+        if fields is not None:
+            return self._load_sparse(product_ids, fields)
+        return {product_id: entry for product_id, (entry, _) in self._load(product_ids).items()}
+
+    def prime(self, product):
+        entry = product.to_dict()
+        self.products.set(product.id, (entry, product.version))
+        self.stock.set(product.id, entry["productStock"])
+        return entry
+
+    def _load(self, product_ids):
+        found, missing = self._lookup(product_ids)
+
+        result = {}
+        if missing:
+            with on_primary():
+                for product in Product.query.filter(Product.id.in_(missing), Product.is_deleted == False):
+                    result[product.id] = (self.prime(product), product.version)
+        result.update(self._with_stock(found))
+        return result
+
+    def _lookup(self, product_ids):
+        # ({id: (entry, version)} of the cached products, [ids of the rest])
+        found = {}
+        missing = []
+        for product_id in product_ids:
+            cached = self.products.get(product_id)
+            if cached is None:
+                missing.append(product_id)
+            else:
+                found[product_id] = cached
+        return found, missing
+
+    def _with_stock(self, found):
+        # cached entries with their stock from the stock cache, re-read where it expired
+        result = {}
+        stale = []
+        for product_id, (entry, version) in found.items():
+            stock = self.stock.get(product_id)
+            if stock is None:
+                stale.append(product_id)
+            else:
+                result[product_id] = (dict(entry, productStock=stock), version)
+
+        if stale:
+            with on_primary():
+                levels = stock_levels(stale)
+            for product_id in stale:
+                stock = levels.get(product_id, 0)
+                self.stock.set(product_id, stock)
+                entry, version = found[product_id]
+                result[product_id] = (dict(entry, productStock=stock), version)
+
+        return result
+
+    def _load_sparse(self, product_ids, fields):
+        cached, missing = self._lookup(product_ids)
+
+        result = {}
+        if missing:
+            # partial rows serve this request only and are never cached
+            query = Product.query.options(fields.load_only(Product)) \
+                .filter(Product.id.in_(missing), Product.is_deleted == False)
+            if 'productStock' in fields.keys:
+                # stock of sharded products is summed over their shard rows
+                query = query.options(selectinload(Product.shards))
+            for product in query:
+                result[product.id] = fields.encode(product)
+        if cached:
+            # fresh stock only when it was asked for
+            if 'productStock' in fields.keys:
+                cached = self._with_stock(cached)
+            for product_id, (entry, _) in cached.items():
+                result[product_id] = fields.project(entry)
+        return result
+
+    def get_list(self, key, loader):
+        # loader returns (product_ids, meta) and should prime() the products it loaded
+        cached = self.lists.get(key)
+        if cached is None:
+            with on_primary():
+                cached = loader()
+            self.lists.set(key, cached)
+        return cached
+
+    def invalidate(self, product_ids):
+        # catalog change: drop the products and every cached list page
+        for product_id in product_ids:
+            self.products.delete(product_id)
+            self.stock.delete(product_id)
+        self.lists.clear()
+
+    def invalidate_stock(self, product_ids):
+        for product_id in product_ids:
+            self.stock.delete(product_id)
+
+    def stats(self):
+        return {
+            "products": self.products.stats(),
+            "stock": self.stock.stats(),
+            "lists": self.lists.stats()
+        }
+
+
+product_cache = ProductCache()
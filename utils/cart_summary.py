@@ -0,0 +1,107 @@
+from flask import current_app
+from sqlalchemy import select, insert, update, func, cast, Numeric
+from sqlalchemy.exc import IntegrityError
+from models.shoppingCart import Cart, CartSummary
+from models.product import Product
+from extensions import db
+
+# The summary row is created by the first write to a cart, from the cart
+# rows, which already include that write; later writes apply deltas to it.
+# Reads never write: a cart without a row yet is summed from its rows.
+
+
+def get_cart_summary(user_id):
+    if not current_app.config['CART_SUMMARY_ENABLED']:
+        return _compute(user_id)
+
+    summary = db.session.get(CartSummary, user_id)
+    if summary:
+        return summary.to_dict()
+    return _compute(user_id)
+
+
+def adjust_cart_summary(user_id, quantity_delta, price_delta):
+    # call after the cart rows have been changed, in the same transaction
+    if not current_app.config['CART_SUMMARY_ENABLED']:
+        return
+    if _apply_delta(user_id, quantity_delta, price_delta):
+        return
+
+    db.session.flush()
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(CartSummary).values(user_id=user_id, **_totals(user_id)))
+    except IntegrityError:
+        # a concurrent write created the row first, from totals that do not include this change
+        _apply_delta(user_id, quantity_delta, price_delta)
+
+
+def reset_cart_summary(user_id):
+    if not current_app.config['CART_SUMMARY_ENABLED']:
+        return
+    db.session.execute(
+        update(CartSummary)
+        .where(CartSummary.user_id == user_id)
+        .values(item_count=0, total_price=0)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reprice_cart_summaries(product_id, price_delta):
+    # a price change moves the total of every cart holding the product
+    _apply_to_carts_with(product_id, price_delta)
+
+
+def drop_product_from_cart_summaries(product_id, price):
+    # deleted products no longer count toward cart totals
+    _apply_to_carts_with(product_id, -price, drop_items=True)
+
+
+def _apply_to_carts_with(product_id, price_per_unit, drop_items=False):
+    if not current_app.config['CART_SUMMARY_ENABLED']:
+        return
+    quantity = (
+        select(func.coalesce(func.sum(Cart.quantity), 0))
+        .where(Cart.user_id == CartSummary.user_id, Cart.product_id == product_id)
+        .scalar_subquery()
+    )
+    values = {"total_price": _cents(CartSummary.total_price + price_per_unit * quantity)}
+    if drop_items:
+        values["item_count"] = CartSummary.item_count - quantity
+    db.session.execute(
+        update(CartSummary)
+        .where(CartSummary.user_id.in_(select(Cart.user_id).where(Cart.product_id == product_id)))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _apply_delta(user_id, quantity_delta, price_delta):
+    # returns whether the user has a summary row
+    return db.session.execute(
+        update(CartSummary)
+        .where(CartSummary.user_id == user_id)
+        .values(item_count=CartSummary.item_count + quantity_delta,
+                total_price=_cents(CartSummary.total_price + price_delta))
+        .execution_options(synchronize_session=False)
+    ).rowcount > 0
+
+
+def _cents(amount):
+    # every total is rounded to cents as it is written, so float error cannot pile up over many deltas
+    return func.round(cast(amount, Numeric(14, 4)), 2)
+
+
+def _totals(user_id):
+    item_count, total_price = db.session.execute(
+        select(func.coalesce(func.sum(Cart.quantity), 0),
+               _cents(func.coalesce(func.sum(Cart.quantity * Product.price), 0)))
+        .join(Product, Product.id == Cart.product_id)
+        .where(Cart.user_id == user_id, Product.is_deleted == False)
+    ).one()
+    return {"item_count": item_count, "total_price": total_price}
+
+
+def _compute(user_id):
+    totals = _totals(user_id)
+    return {"userId": user_id, "itemCount": totals["item_count"], "totalPrice": totals["total_price"]}
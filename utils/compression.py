@@ -0,0 +1,87 @@
+import zlib
+from flask import request
+
+# zlib window bits for the two HTTP codings: gzip wrapper and zlib ("deflate") wrapper
+WBITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+class Compression:
+    """gzip/deflate response compression negotiated through Accept-Encoding.
+
+    Responses of a COMPRESS_MIMETYPES type are compressed at COMPRESS_LEVEL;
+    buffered ones only from COMPRESS_MIN_SIZE bytes, streamed ones (exports)
+    always, chunk by chunk with a sync flush so each chunk still reaches the
+    client as soon as it is produced. Other types, including ones that are
+    already compressed, responses with a Content-Encoding and file downloads
+    pass through untouched. A compressed response's strong ETag gets the
+    coding as a suffix ("...-gzip"), since its bytes differ from the
+    identity representation; utils.etag accepts the suffixed tags back in
+    If-None-Match and If-Match.
+    """
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.level = app.config['COMPRESS_LEVEL']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = frozenset(app.config['COMPRESS_MIMETYPES'])
+        app.extensions['compression'] = self
+        if app.config['COMPRESS_ENABLED']:
+            app.after_request(self._compress)
+
+    def _compress(self, response):
+        if (response.mimetype not in self.mimetypes or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)):
+            return response
+        # the body depends on Accept-Encoding from here on, compressed or not
+        response.vary.add('Accept-Encoding')
+
+        coding = _negotiate()
+        if coding is None or request.method == 'HEAD':
+            return response
+
+        if response.is_streamed:
+            response.response = _compress_stream(response.response, coding, self.level)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, WBITS[coding])
+            response.set_data(compressor.compress(data) + compressor.flush())
+        response.headers['Content-Encoding'] = coding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(f"{etag}-{coding}")
+        return response
+
+
+def _negotiate():
+    # gzip when the client takes both; None for identity only
+    accept = request.accept_encodings
+    for coding in ('gzip', 'deflate'):
+        if accept.quality(coding) > 0:
+            return coding
+    return None
+
+
+def _compress_stream(chunks, coding, level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, WBITS[coding])
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        yield compressor.flush()
+    finally:
+        # closes the original iterable, e.g. the export's database cursor
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+compression = Compression()
@@ -1,26 +1,68 @@
 from flask_jwt_extended import verify_jwt_in_request, get_jwt
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, g
+
+# one bit per role; a user's mask also holds the bits of the roles theirs includes
+USER = 1 << 0
+ADMIN = 1 << 1
+ROLE_BITS = {"user": USER, "admin": ADMIN}
+ROLE_MASKS = {
+    "user": USER,
+    "admin": USER | ADMIN,
+}
+
+
+class Principal:
+    """The authenticated caller, parsed once from the JWT claims."""
+
+    __slots__ = ("id", "email", "role", "mask")
+
+    def __init__(self, claims):
+        identity = claims.get("sub")
+        if not isinstance(identity, dict):
+            identity = {"id": identity}
+        self.id = identity.get("id")
+        self.email = identity.get("email")
+        # tokens carry the role as a top-level claim; older ones only inside the identity
+        self.role = claims.get("role", identity.get("role"))
+        self.mask = ROLE_MASKS.get(self.role, 0)
+
+
+def current_principal():
+    """Return the caller's Principal, verifying the JWT on first use only.
+
+    The result is kept on flask.g, and a token already verified by
+    @jwt_required() is reused rather than decoded again, so stacked
+    decorators cost a dictionary lookup each.
+    """
+    principal = g.get("_principal")
+    if principal is None:
+        # jwt_required() leaves the decoded token here; an empty dict means no token
+        if not g.get("_jwt_extended_jwt"):
+            verify_jwt_in_request()
+        principal = g._principal = Principal(get_jwt())
+    return principal
+
+
+def role_required(*roles):
+    # any one of the roles is enough; the mask is built once, when the route is decorated
+    required = 0
+    for role in roles:
+        required |= ROLE_BITS[role]
 
-def role_required(required_role):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             try:
-                verify_jwt_in_request()  # 验证 JWT 是否有效
-                claims = get_jwt()  # 提取 JWT claims
-                print(f"Claims: {claims}")  # 打印 claims 以便调试
-                user_identity = claims.get("sub")  # 从 claims 中提取 identity（sub 字段）
-                user_role = user_identity.get("role")  # 从 identity 中提取 role
-                print(f"user_role: {user_role}, required_role: {required_role}")
-
-                if user_role != required_role:
-                    return jsonify({"error": "You do not have permission to perform this action."}), 403
-
-                return func(*args, **kwargs)
-            except Exception as e:
-                print(f"Error in role_required: {str(e)}")  # 打印具体异常以调试
+                principal = current_principal()
+            except (JWTExtendedException, PyJWTError):
                 return jsonify({"error": "Invalid or missing token"}), 401
+
+            if not principal.mask & required:
+                return jsonify({"error": "You do not have permission to perform this action."}), 403
+
+            return func(*args, **kwargs)
         return wrapper
     return decorator
-
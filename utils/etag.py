@@ -0,0 +1,43 @@
+from flask import request, jsonify, Response
+from utils.compression import WBITS
+
+
+def etag_for(*parts):
+    # strong entity tag built from row versions (and, for products, stock)
+    return '-'.join(str(part) for part in parts)
+
+
+def is_not_modified(etag):
+    return _match(request.if_none_match, etag, weak=True) is not None
+
+
+def if_match_failed(etag):
+    # only a present If-Match header that names another version fails
+    return 'If-Match' in request.headers and _match(request.if_match, etag) is None
+
+
+def not_modified(etag):
+    response = Response(status=304)
+    # the tag the client holds, which names the coding its copy was sent in
+    response.set_etag(_match(request.if_none_match, etag, weak=True) or etag)
+    return response
+
+
+def precondition_failed(etag):
+    response = jsonify({"error": "Resource was modified by another request"})
+    response.set_etag(etag)
+    return response, 412
+
+
+def tagged(payload, etag, status=200):
+    response = jsonify(payload)
+    response.set_etag(etag)
+    return response, status
+
+
+def _match(tags, etag, weak=False):
+    # the variant of etag that tags names: as built, or with the suffix Compression adds per coding
+    for variant in (etag, *(f"{etag}-{coding}" for coding in WBITS)):
+        if tags.contains_weak(variant) if weak else tags.contains(variant):
+            return variant
+    return None
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy import select, func
+from models.order import Order, OrderItem, ORDER_COLUMNS, ORDER_ITEM_COLUMNS, order_dict, order_item_dict
+from models.product import Product, ProductStockShard, product_dict
+from models.user import User, user_dict
+from extensions import db
+from utils.replica import read_engine
+
+FORMATS = ('ndjson', 'csv')
+# bytes buffered before a chunk is handed to the server
+CHUNK_SIZE = 64 * 1024
+
+ORDER_CSV_HEADER = ["orderId", "userId", "status", "totalPrice", "createdAt", "updatedAt",
+                    "itemId", "productId", "quantity", "unitPrice"]
+PRODUCT_CSV_HEADER = ["id", "productName", "productDescription", "productPrice", "productStock", "is_deleted_product"]
+USER_CSV_HEADER = ["id", "username", "email", "role", "is_deleted"]
+
+
+def export_orders():
+    """Stream orders with their items, filtered by status, userId and from/to dates.
+
+    Orders come from a server-side cursor in partitions of EXPORT_BATCH_SIZE
+    rows; each partition's items are fetched with one IN query on the
+    session's own connection, so memory holds one partition at a time.
+    """
+    query = select(*ORDER_COLUMNS).where(Order.is_deleted == False).order_by(Order.id)
+    statuses = request.args.get('status')
+    if statuses:
+        query = query.where(Order.status.in_(statuses.split(',')))
+    user_id = request.args.get('userId', type=int)
+    if user_id:
+        query = query.where(Order.user_id == user_id)
+    date_from, date_to = _date_range()
+    if date_from:
+        query = query.where(Order.created_at >= date_from)
+    if date_to:
+        query = query.where(Order.created_at < date_to)
+
+    def records():
+        for partition in _partitions(query):
+            items = {}
+            item_rows = db.session.execute(
+                select(*ORDER_ITEM_COLUMNS)
+                .where(OrderItem.order_id.in_([row.id for row in partition]))
+                .order_by(OrderItem.id)
+            )
+            for row in item_rows:
+                items.setdefault(row.order_id, []).append(order_item_dict(row))
+            for row in partition:
+                yield order_dict(row, items.get(row.id, []))
+
+    def csv_rows(order):
+        head = [order["id"], order["userId"], order["status"], order["totalPrice"],
+                order["createdAt"], order["updatedAt"]]
+        if not order["items"]:
+            yield head + [None] * 4
+        for item in order["items"]:
+            yield head + [item["id"], item["productId"], item["quantity"], item["unitPrice"]]
+
+    return _stream('orders', records, ORDER_CSV_HEADER, csv_rows)
+
+
+def export_products():
+    shard_stock = (
+        select(func.coalesce(func.sum(ProductStockShard.stock), 0))
+        .where(ProductStockShard.product_id == Product.id)
+        .scalar_subquery()
+    )
+    query = select(Product.id, Product.name, Product.description, Product.price, Product.is_deleted,
+                   (Product.stock + shard_stock).label('available_stock')).order_by(Product.id)
+    if request.args.get('include_deleted', 'false').lower() not in ('1', 'true', 'yes'):
+        query = query.where(Product.is_deleted == False)
+
+    def records():
+        for partition in _partitions(query):
+            for row in partition:
+                yield product_dict(row)
+
+    return _stream('products', records, PRODUCT_CSV_HEADER, lambda product: [list(product.values())])
+
+
+def export_users():
+    query = select(User.id, User.username, User.email, User.role, User.is_deleted) \
+        .where(User.is_deleted == False).order_by(User.id)
+    role = request.args.get('role')
+    if role:
+        query = query.where(User.role == role)
+
+    def records():
+        for partition in _partitions(query):
+            for row in partition:
+                yield user_dict(row)
+
+    return _stream('users', records, USER_CSV_HEADER, lambda user: [list(user.values())])
+
+
+def _date_range():
+    # raises ValueError for dates that are not ISO 8601
+    bounds = []
+    for name in ('from', 'to'):
+        value = request.args.get(name)
+        bounds.append(datetime.fromisoformat(value) if value else None)
+    return bounds
+
+
+def _partitions(query):
+    # a dedicated connection holds the server-side cursor, leaving the
+    # session's connection free for the queries made while streaming
+    size = current_app.config['EXPORT_BATCH_SIZE']
+    with read_engine(db).connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=size).execute(query)
+        for partition in result.partitions():
+            yield partition
+
+
+def _stream(name, records, csv_header, csv_rows):
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(csv_header)
+            # send the header right away so the client sees the first byte immediately
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        for record in records():
+            if fmt == 'csv':
+                writer.writerows(csv_rows(record))
+            else:
+                buffer.write(json.dumps(record))
+                buffer.write('\n')
+            if buffer.tell() >= CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={name}.{fmt}"})
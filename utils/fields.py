@@ -0,0 +1,68 @@
+import zlib
+from functools import lru_cache
+from flask import request
+from sqlalchemy.orm import load_only
+from utils.serializers import compile_serializer
+
+
+class FieldSet:
+    """The part of a model's representation one request asked for.
+
+    Built from a serializer field spec (see compile_serializer) and the
+    ?fields=a,b and ?include=items arguments. It knows the response keys,
+    the model columns needed to produce them, which relationships to load,
+    and an encoder compiled for exactly those keys.
+    """
+
+    def __init__(self, name, spec, keys, includes, computed):
+        self.keys = keys
+        self.includes = includes
+        self.attributes = []
+        for key, attribute, *_ in spec:
+            if key in keys and attribute not in includes:
+                for column in computed.get(attribute, (attribute,)):
+                    if column not in self.attributes:
+                        self.attributes.append(column)
+        self.encode = _compile(name, spec, keys, includes)
+        # keeps the ETag of a partial representation apart from the full one
+        self.tag = f"f{zlib.crc32(','.join(keys).encode()):08x}"
+
+    def load_only(self, model, *extra):
+        # loader option for the needed columns, plus extra ones such as the version for ETags
+        return load_only(*[getattr(model, attribute) for attribute in self.attributes], *extra)
+
+    def project(self, entry):
+        # trim an already serialized (for example cached) full representation
+        return {key: entry[key] for key in self.keys}
+
+
+def requested_fields(name, spec, relations=(), computed=None):
+    """Parse the request's fields= and include= arguments against spec.
+
+    Returns None when fields= is absent, meaning the full representation
+    (relations included, as before). Otherwise "id" is always returned,
+    and relations only when listed in fields= or include=. computed maps
+    attributes that are not columns, like a property, to the columns they
+    read. Raises ValueError naming any unknown field.
+    """
+    fields = request.args.get('fields')
+    if fields is None:
+        return None
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    includes = {relation.strip() for relation in request.args.get('include', '').split(',') if relation.strip()}
+
+    known = {key for key, *_ in spec}
+    unknown = sorted((requested - known) | (includes - set(relations)))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    includes = tuple(relation for relation in relations if relation in requested or relation in includes)
+    keys = tuple(key for key, attribute, *_ in spec
+                 if key == 'id' or key in requested or attribute in includes)
+    return FieldSet(name, spec, keys, includes, computed or {})
+
+
+@lru_cache(maxsize=256)
+def _compile(name, spec, keys, includes):
+    # one encoder per distinct selection, shared by every request asking for it
+    return compile_serializer(name, [field for field in spec if field[0] in keys], args=includes)
@@ -0,0 +1,151 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+
+slow_log = logging.getLogger('jade.slow')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label tuple."""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}
+
+    def observe(self, labels, value):
+        # called with the Metrics lock held
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            base = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{base}}} {total:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative}")
+        return lines
+
+
+class Metrics:
+    """Per-request SQL and timing instrumentation.
+
+    Engine events count statements and time spent in the database for the
+    current request; request hooks add a Server-Timing header, feed the
+    histograms served at /metrics, and write a JSON line to the jade.slow
+    logger for requests over SLOW_REQUEST_MS and statements over
+    SLOW_QUERY_MS. The histograms are per process, so each worker is
+    scraped on its own.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.duration = Histogram("jade_http_request_duration_seconds", "Time to produce the response.",
+                                  DURATION_BUCKETS, ("method", "endpoint", "status"))
+        self.db_time = Histogram("jade_http_request_db_seconds", "Time spent in SQL statements per request.",
+                                 DURATION_BUCKETS, ("method", "endpoint"))
+        self.statements = Histogram("jade_http_request_sql_statements", "SQL statements per request.",
+                                    STATEMENT_BUCKETS, ("method", "endpoint"))
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.enabled = app.config['METRICS_ENABLED']
+        self.slow_request = app.config['SLOW_REQUEST_MS'] / 1000
+        self.slow_query = app.config['SLOW_QUERY_MS'] / 1000
+        app.extensions['metrics'] = self
+        if not self.enabled:
+            return
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_statement)
+                event.listen(engine, 'after_cursor_execute', self._after_statement)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.add_url_rule('/metrics', 'metrics', self.render)
+
+    def _start(self):
+        # [statements, seconds in the database]
+        g._metrics_sql = [0, 0.0]
+        g._metrics_started = time.perf_counter()
+
+    def _before_statement(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info['_metrics_started'] = time.perf_counter()
+
+    def _after_statement(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info.pop('_metrics_started', time.perf_counter())
+        in_request = has_request_context()
+        if in_request:
+            sql = g.get('_metrics_sql')
+            if sql is not None:
+                sql[0] += 1
+                sql[1] += elapsed
+        if elapsed >= self.slow_query:
+            slow_log.warning(json.dumps({
+                "event": "slow_query",
+                "ms": round(elapsed * 1000, 1),
+                "endpoint": request.endpoint if in_request else None,
+                "statement": ' '.join(statement.split())[:2000],
+                "executemany": executemany,
+            }))
+
+    def _finish(self, response):
+        started = g.get('_metrics_started')
+        if started is None or request.endpoint == 'metrics':
+            return response
+        elapsed = time.perf_counter() - started
+        statements, db_seconds = g._metrics_sql
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        with self._lock:
+            self.duration.observe((request.method, endpoint, str(response.status_code)), elapsed)
+            self.db_time.observe((request.method, endpoint), db_seconds)
+            self.statements.observe((request.method, endpoint), statements)
+
+        response.headers.add('Server-Timing', f'db;dur={db_seconds * 1000:.1f};desc="{statements} queries"')
+        response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+
+        if elapsed >= self.slow_request:
+            slow_log.warning(json.dumps({
+                "event": "slow_request",
+                "ms": round(elapsed * 1000, 1),
+                "method": request.method,
+                "endpoint": endpoint,
+                "path": request.full_path.rstrip('?'),
+                "status": response.status_code,
+                "statements": statements,
+                "db_ms": round(db_seconds * 1000, 1),
+            }))
+        return response
+
+    def reset(self):
+        # forget everything observed so far, such as the warmup requests
+        with self._lock:
+            for histogram in (self.duration, self.db_time, self.statements):
+                histogram._series.clear()
+
+    def render(self):
+        with self._lock:
+            lines = self.duration.render() + self.db_time.render() + self.statements.render()
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+metrics = Metrics()
@@ -0,0 +1,116 @@
+import base64
+import json
+import threading
+import time
+from flask import current_app, request
+from sqlalchemy import and_, or_
+from extensions import db
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, limit, total=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.limit = limit
+        self.total = total
+
+    def meta(self):
+        meta = {"next_cursor": self.next_cursor, "limit": self.limit}
+        if self.total is not None:
+            meta["total"] = self.total
+        return meta
+
+
+def wants_keyset():
+    # cursor mode is opt-in so existing page/per_page clients keep working
+    return 'after' in request.args or 'limit' in request.args
+
+
+def keyset_paginate(query, sort_columns, id_column):
+    """Seek-paginate a select using the after/limit/sort/with_total args.
+
+    Rows are fetched with ``WHERE (sort key, id) > last seen`` instead of an
+    OFFSET, so every page costs the same however deep it is. The total is
+    only counted when with_total is set, and is then served from a short-lived
+    per-process cache. sort_columns maps the allowed sort names to columns.
+    Raises ValueError for an unknown sort key or a malformed cursor.
+    """
+    sort = request.args.get('sort', 'id', type=str)
+    if sort not in sort_columns:
+        raise ValueError(f"Unsupported sort key: {sort}")
+    sort_column = sort_columns[sort]
+
+    limit = request.args.get('limit', 10, type=int)
+    limit = max(1, min(limit, current_app.config['PAGINATION_MAX_LIMIT']))
+
+    total = None
+    if request.args.get('with_total', 'false').lower() in ('1', 'true', 'yes'):
+        total = _cached_count(query)
+
+    after = request.args.get('after')
+    if after:
+        cursor_sort, last_value, last_id = decode_cursor(after)
+        if cursor_sort != sort:
+            raise ValueError("Cursor does not match the sort key")
+        if sort_column is id_column:
+            query = query.where(id_column > last_id)
+        else:
+            query = query.where(or_(
+                sort_column > last_value,
+                and_(sort_column == last_value, id_column > last_id)
+            ))
+
+    # add the key columns to the select so the cursor can be built from the last row
+    query = query.add_columns(sort_column, id_column)
+    rows = db.session.execute(query.order_by(sort_column, id_column).limit(limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(sort, rows[-1][-2], rows[-1][-1])
+
+    return KeysetPage([row[0] for row in rows], next_cursor, limit, total)
+
+
+def encode_cursor(sort, value, last_id):
+    payload = json.dumps([sort, value, last_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    # the value and id go straight into the WHERE clause, so only scalars of the key's types pass
+    if (not isinstance(sort, str) or not isinstance(value, (str, int, float))
+            or not isinstance(last_id, int) or isinstance(value, bool) or isinstance(last_id, bool)):
+        raise ValueError("Invalid cursor")
+    return sort, value, last_id
+
+
+_count_cache = {}
+_count_lock = threading.Lock()
+
+
+def _cached_count(query):
+    compiled = query.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    ttl = current_app.config['PAGINATION_COUNT_TTL']
+    now = time.monotonic()
+
+    with _count_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    count = db.session.execute(
+        db.select(db.func.count()).select_from(query.order_by(None).subquery())
+    ).scalar()
+
+    with _count_lock:
+        if len(_count_cache) >= 1024:
+            _count_cache.clear()
+        _count_cache[key] = (count, now + ttl)
+    return count
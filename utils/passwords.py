@@ -0,0 +1,90 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when too many hashes are already queued for the pool."""
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded pool of worker processes.
+
+    KDF work runs outside the request worker, so a login storm queues in
+    the pool instead of taking CPU from every other request. At most
+    PASSWORD_HASH_MAX_PENDING hashes wait at once; beyond that callers get
+    HashingBusy after PASSWORD_HASH_TIMEOUT seconds. With
+    PASSWORD_HASH_WORKERS = 0 everything runs inline on the calling thread.
+    Workers are spawned, so scripts that hash passwords need the usual
+    if __name__ == '__main__' guard.
+    """
+
+    def __init__(self, app=None):
+        self.method = 'pbkdf2:sha256:600000'
+        self.salt_length = 16
+        self.workers = 0
+        self.timeout = 10
+        self.prefix = self.method
+        self._slots = None
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+        # werkzeug writes the method with its defaults filled in ("scrypt" becomes
+        # "scrypt:32768:8:1"), so take the prefix from a real hash rather than the setting
+        self.prefix = generate_password_hash('', self.method, self.salt_length).split('$', 1)[0]
+        self._slots = threading.BoundedSemaphore(max(1, app.config['PASSWORD_HASH_MAX_PENDING']))
+        app.extensions['password_hasher'] = self
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method, self.salt_length)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        # the part before the first "$" records the method and its parameters
+        return stored_hash.split('$', 1)[0] != self.prefix
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            future = self._executor().submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # the slot is freed when the hash is done, not when the caller stops waiting,
+        # so hashes whose callers timed out still count as pending
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # a hash that has not started yet is dropped; its callback frees the slot
+            future.cancel()
+            raise HashingBusy()
+
+    def _executor(self):
+        # a pool inherited through fork is unusable, so each process builds its own
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                # spawn rather than fork: forking a threaded server process is unsafe
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+                self._pool_pid = os.getpid()
+            return self._pool
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,236 @@
+import csv
+import io
+import json
+import math
+import re
+import time
+from itertools import islice
+from sqlalchemy import insert, update, select, bindparam
+from sqlalchemy.exc import IntegrityError
+from models.product import Product
+from extensions import db
+from utils.cache import product_cache
+from utils.cart_summary import reprice_cart_summaries
+from utils.stock import set_stock
+
+FORMATS = ('ndjson', 'csv')
+
+# bytes that are not valid UTF-8 decode to lone surrogates under surrogateescape
+_INVALID_BYTES = re.compile('[\udc80-\udcff]')
+_INVALID_UTF8 = object()
+
+_product = Product.__table__
+_update_by_id = (
+    update(_product)
+    .where(_product.c.id == bindparam('row_id'))
+    .values(name=bindparam('name'), description=bindparam('description'),
+            price=bindparam('price'), stock=bindparam('stock'), version=_product.c.version + 1)
+)
+
+
+class ImportReport:
+    def __init__(self, max_errors):
+        self.max_errors = max_errors
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, line, message):
+        self.failed += 1
+        # only the first max_errors are kept so a bad file cannot grow the report without bound
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errorsTruncated": self.failed > len(self.errors),
+            "seconds": round(self.elapsed, 3),
+            "rowsPerSecond": round(self.rows / self.elapsed) if self.elapsed else 0
+        }
+
+
+def import_products(stream, fmt, mode='insert', batch_size=1000, max_errors=1000):
+    """Load products from a binary NDJSON or CSV stream.
+
+    The stream is parsed one record at a time and written in batches of
+    batch_size rows with executemany, committing after each batch, so
+    memory stays bounded by the batch size whatever the input size. In
+    upsert mode rows carrying an existing id update that product, keeping
+    the current value of every field the record leaves out; all other rows
+    are inserted. Invalid rows are skipped and reported by line.
+    """
+    report = ImportReport(max_errors)
+    records = _read(stream, fmt)
+    while True:
+        chunk = list(islice(records, batch_size))
+        if not chunk:
+            break
+
+        batch = []
+        for line, record in chunk:
+            report.rows += 1
+            values, error = _validate(record, mode)
+            if error:
+                report.error(line, error)
+            else:
+                batch.append((line, values))
+
+        if batch:
+            try:
+                _write_batch(batch, mode, report)
+            except IntegrityError:
+                # retry row by row so one conflicting row does not sink its whole batch
+                db.session.rollback()
+                for line, values in batch:
+                    try:
+                        _write_batch([(line, values)], mode, report)
+                    except IntegrityError as e:
+                        db.session.rollback()
+                        report.error(line, f"Rejected by the database: {e.orig}")
+
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+def _read(stream, fmt):
+    # a line with invalid UTF-8 is reported like any other bad row instead of aborting the import
+    text = io.TextIOWrapper(stream, encoding='utf-8', errors='surrogateescape', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            if any(_INVALID_BYTES.search(value) for value in record.values() if isinstance(value, str)):
+                record = _INVALID_UTF8
+            yield reader.line_num, record
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        if _INVALID_BYTES.search(line):
+            yield line_no, _INVALID_UTF8
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError:
+            yield line_no, None
+
+
+def _validate(record, mode):
+    if record is _INVALID_UTF8:
+        return None, "Invalid UTF-8"
+    if not isinstance(record, dict):
+        return None, "Malformed record"
+
+    try:
+        # ids are only honoured when upserting; a plain import always adds new products
+        row_id = int(record['id']) if mode == 'upsert' and _present(record, 'id') else None
+        values = {"row_id": row_id}
+        if _present(record, 'price'):
+            values["price"] = float(record['price'])
+        if _present(record, 'stock'):
+            values["stock"] = int(record['stock'])
+    except (TypeError, ValueError):
+        return None, "price, stock and id must be numbers"
+    # float() takes "nan" and "inf", and NaN compares false with everything
+    if not math.isfinite(values.get("price", 1)):
+        return None, "price must be a finite number"
+    if values.get("price", 1) <= 0 or values.get("stock", 0) < 0:
+        return None, "price must be positive and stock must not be negative"
+
+    if _present(record, 'name'):
+        name = record['name']
+        if not isinstance(name, str):
+            return None, "Missing name"
+        if len(name) > 100:
+            return None, "name is longer than 100 characters"
+        values["name"] = name
+    if record.get('description') is not None:
+        values["description"] = record['description']
+
+    # a row that may update an existing product only needs the fields it changes
+    if row_id is None:
+        missing = _missing(values)
+        if missing:
+            return None, missing
+        values.setdefault("description", '')
+    return values, None
+
+
+def _present(record, key):
+    return record.get(key) not in (None, '')
+
+
+def _missing(values):
+    if "name" not in values:
+        return "Missing name"
+    if "price" not in values or "stock" not in values:
+        return "price, stock and id must be numbers"
+    return None
+
+
+def _write_batch(batch, mode, report):
+    current = {}
+    if mode == 'upsert':
+        ids = [values["row_id"] for _, values in batch if values["row_id"] is not None]
+        if ids:
+            rows = db.session.execute(
+                select(Product.id, Product.name, Product.description, Product.price, Product.stock,
+                       Product.stock_shards)
+                .where(Product.id.in_(ids))
+            )
+            current = {row.id: row for row in rows}
+
+    updates, restocked = [], []
+    for _, values in batch:
+        row = current.get(values["row_id"])
+        if row is None:
+            continue
+        if "price" in values and values["price"] != row.price:
+            reprice_cart_summaries(row.id, values["price"] - row.price)
+        if "stock" in values and row.stock_shards:
+            restocked.append((row.id, values["stock"]))
+        # fields the record leaves out keep their current values
+        updates.append({"name": row.name, "description": row.description, "price": row.price,
+                        "stock": row.stock, **values})
+    if updates:
+        db.session.execute(_update_by_id, updates)
+    # sharded products keep their stock in shard rows, so spread it there
+    for product_id, stock in restocked:
+        set_stock(db.session.get(Product, product_id), stock)
+
+    inserts, incomplete = [], []
+    for line, values in batch:
+        if values["row_id"] in current:
+            continue
+        missing = _missing(values)
+        if missing:
+            # an upsert row whose id does not exist yet becomes a new product and needs every field
+            incomplete.append((line, missing))
+            continue
+        inserts.append({**({"id": values["row_id"]} if values["row_id"] is not None else {}),
+                        "name": values["name"], "description": values.get("description", ''),
+                        "price": values["price"], "stock": values["stock"],
+                        "is_deleted": False, "stock_shards": 0, "version": 1})
+    # rows with and without an explicit id need different INSERT statements
+    for group in ([row for row in inserts if "id" in row], [row for row in inserts if "id" not in row]):
+        if group:
+            db.session.execute(insert(Product), group)
+
+    db.session.commit()
+    report.inserted += len(inserts)
+    report.updated += len(updates)
+    # reported only once the batch is written, so a retried batch does not report them twice
+    for line, error in incomplete:
+        report.error(line, error)
+    if updates or inserts:
+        # new products change list pages too, so this drops every cached list
+        product_cache.invalidate([values["row_id"] for values in updates])
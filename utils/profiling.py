@@ -0,0 +1,152 @@
+import cProfile
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from flask import g, request, has_request_context
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import PyJWTError
+from sqlalchemy import event
+from utils.decorators import current_principal, ADMIN
+
+# sent by an admin to profile that one request; the response carries the profile id back
+PROFILE_HEADER = 'X-Profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_ID = re.compile(r'^[\w.-]+$')
+
+
+class RequestProfiler:
+    """cProfile individual requests and keep the results on disk.
+
+    A request is profiled when an admin sends the X-Profile header, or at
+    random with probability PROFILE_SAMPLE_RATE. Each capture is a pstats
+    file <id>.prof plus <id>.json holding the endpoint, timings and every
+    SQL statement the request ran. Only one request per process is
+    profiled at a time; others arriving meanwhile run unprofiled.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._busy = threading.Lock()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.directory = os.path.join(app.root_path, app.config['PROFILE_DIR'])
+        self.sample_rate = app.config['PROFILE_SAMPLE_RATE']
+        self.max_files = app.config['PROFILE_MAX_FILES']
+        app.extensions['profiler'] = self
+
+        with app.app_context():
+            for engine in db.engines.values():
+                event.listen(engine, 'before_cursor_execute', self._before_statement)
+                event.listen(engine, 'after_cursor_execute', self._after_statement)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        # runs even when a view or another after_request hook raises, so the lock is always released
+        app.teardown_request(self._release)
+
+    def _start(self):
+        requested = bool(request.headers.get(PROFILE_HEADER)) and _is_admin()
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return
+        if not self._busy.acquire(blocking=False):
+            return
+        g._profile_requested = requested
+        g._profile_sql = []
+        g._profile = cProfile.Profile()
+        g._profile_started = time.perf_counter()
+        g._profile.enable()
+
+    def _before_statement(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get('_profile_sql') is not None:
+            conn.info['_profile_started'] = time.perf_counter()
+
+    def _after_statement(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('_profile_started', None)
+        if started is not None:
+            g._profile_sql.append({"ms": round((time.perf_counter() - started) * 1000, 3),
+                                   "statement": statement, "executemany": executemany})
+
+    def _finish(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        profile.disable()
+        elapsed = time.perf_counter() - g._profile_started
+        statements = g.pop('_profile_sql')
+
+        endpoint = request.endpoint or 'unmatched'
+        profile_id = f"{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint}-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        with open(os.path.join(self.directory, f"{profile_id}.json"), 'w') as meta:
+            json.dump({
+                "id": profile_id,
+                "endpoint": endpoint,
+                "method": request.method,
+                "path": request.full_path.rstrip('?'),
+                "status": response.status_code,
+                "ms": round(elapsed * 1000, 1),
+                "captured_at": datetime.utcnow().isoformat(),
+                "sampled": not g._profile_requested,
+                "sql": statements,
+            }, meta)
+        self._prune()
+        response.headers[PROFILE_ID_HEADER] = profile_id
+        return response
+
+    def _release(self, exc):
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            profile.disable()
+        g.pop('_profile_sql', None)
+        if g.pop('_profile_started', None) is not None:
+            self._busy.release()
+
+    def _prune(self):
+        # keep the newest PROFILE_MAX_FILES captures
+        for meta in self.list()[self.max_files:]:
+            for suffix in ('.prof', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, meta["id"] + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def list(self):
+        """Metadata of the captured profiles, newest first, without the SQL."""
+        if not os.path.isdir(self.directory):
+            return []
+        captures = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as meta:
+                    data = json.load(meta)
+            except (OSError, ValueError):
+                continue
+            data["statements"] = len(data.pop("sql", []))
+            captures.append(data)
+        captures.sort(key=lambda data: data["id"], reverse=True)
+        return captures
+
+    def path(self, profile_id, suffix):
+        # None for ids that are malformed or were never captured
+        if not PROFILE_ID.match(profile_id):
+            return None
+        path = os.path.join(self.directory, profile_id + suffix)
+        return path if os.path.isfile(path) else None
+
+
+def _is_admin():
+    try:
+        return bool(current_principal().mask & ADMIN)
+    except (JWTExtendedException, PyJWTError):
+        return False
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,92 @@
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, request, current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+REPLICA_BIND = 'replica'
+# set after a write; until it expires the client's reads stay on the primary
+STICKY_COOKIE = 'db_primary_until'
+# the same deadline for API clients without a cookie jar: sent after a write, echoed back
+STICKY_HEADER = 'X-DB-Primary-Until'
+
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs of replica_read endpoints to the replica bind.
+
+    Everything else goes to the primary: flushes, INSERT/UPDATE/DELETE,
+    SELECT ... FOR UPDATE, raw SQL, and every statement after the first
+    write in a request, so a request always reads its own writes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_app_context():
+            if self._flushing or isinstance(clause, UpdateBase):
+                g._db_wrote = True
+            elif (isinstance(clause, Select) and clause._for_update_arg is None
+                  and g.get('_db_replica') and not g.get('_db_wrote')):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def init_replica(app):
+    # marks clients that wrote, so their next reads see their own changes
+    sticky = app.config['REPLICA_STICKY_SECONDS']
+
+    @app.after_request
+    def stick_to_primary(response):
+        if g.get('_db_wrote') and sticky > 0:
+            until = str(int(time.time()) + sticky)
+            response.set_cookie(STICKY_COOKIE, until, max_age=sticky, httponly=True)
+            response.headers[STICKY_HEADER] = until
+        return response
+
+
+def replica_read(func):
+    # route the endpoint's reads to the replica, unless none is configured or the client wrote recently
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if REPLICA_BIND in _config_binds() and not _sticky():
+            g._db_replica = True
+        return func(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def on_primary():
+    """Send the reads inside the block to the primary, even in a replica_read endpoint.
+
+    For results that outlive the request, like shared cache entries: a
+    lagging replica would otherwise keep serving its stale rows to every
+    client for the whole cache TTL.
+    """
+    if not has_app_context():
+        yield
+        return
+    replica = g.pop('_db_replica', None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g._db_replica = replica
+
+
+def read_engine(db):
+    # engine for long reads made outside the session, such as streaming exports
+    if REPLICA_BIND in _config_binds() and not _sticky() and not g.get('_db_wrote'):
+        return db.engines[REPLICA_BIND]
+    return db.engine
+
+
+def _config_binds():
+    return current_app.config.get('SQLALCHEMY_BINDS') or {}
+
+
+def _sticky():
+    until = request.headers.get(STICKY_HEADER) or request.cookies.get(STICKY_COOKIE, 0)
+    try:
+        return int(until) > time.time()
+    except ValueError:
+        return False
@@ -0,0 +1,178 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, insert, func
+from sqlalchemy.exc import IntegrityError
+from models.revoked_token import RevokedToken
+from extensions import db
+from utils.replica import on_primary
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings.
+
+    Sized for capacity items at false_positive_rate; k bit positions per
+    item come from one blake2b digest by double hashing.
+    """
+
+    def __init__(self, capacity, false_positive_rate):
+        self.capacity = max(1, capacity)
+        self.size = max(8, int(math.ceil(-self.capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def false_positive_rate(self):
+        # expected rate at the current fill: (1 - e^(-kn/m))^k
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+class RevocationList:
+    """Revoked JWT ids, answered from a per-worker Bloom filter.
+
+    Revocations are stored in revoked_token until the token expires. Each
+    worker mirrors the table in a Bloom filter and at most every
+    REVOCATION_REFRESH_SECONDS pulls the rows revoked since the newest one
+    it has seen, less REVOCATION_REFRESH_SKEW_SECONDS. The overlap catches
+    rows that became visible out of order, which an id high-water mark
+    would skip for good. A token that is not revoked is accepted without a
+    query; only a filter hit is confirmed against the table, which rules
+    out false positives. A revocation made on another worker takes effect
+    there after the next refresh.
+    """
+
+    def __init__(self, app=None):
+        self.capacity = 100000
+        self.fp_rate = 0.001
+        self.refresh_seconds = 5
+        self.refresh_skew = timedelta(seconds=30)
+        self.purge_seconds = 3600
+        self._lock = threading.Lock()
+        self._reset()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app, jwt=None):
+        self.capacity = app.config['REVOCATION_BLOOM_CAPACITY']
+        self.fp_rate = app.config['REVOCATION_BLOOM_FP_RATE']
+        self.refresh_seconds = app.config['REVOCATION_REFRESH_SECONDS']
+        self.refresh_skew = timedelta(seconds=app.config['REVOCATION_REFRESH_SKEW_SECONDS'])
+        self.purge_seconds = app.config['REVOCATION_PURGE_SECONDS']
+        self._reset()
+        app.extensions['revocation_list'] = self
+        if jwt is not None:
+            jwt.token_in_blocklist_loader(lambda jwt_header, jwt_payload: self.is_revoked(jwt_payload["jti"]))
+
+    def _reset(self):
+        self.filter = BloomFilter(self.capacity, self.fp_rate)
+        self._last_seen = None
+        self._refreshed = None
+        self._purged = time.monotonic()
+        self.lookups = 0
+        self.db_checks = 0
+        self.false_positives = 0
+
+    def revoke(self, jti, expires):
+        # expires is the token's exp claim (seconds since the epoch)
+        try:
+            db.session.execute(insert(RevokedToken).values(
+                jti=jti, expires_at=datetime.utcfromtimestamp(expires), revoked_at=datetime.utcnow()))
+            db.session.commit()
+        except IntegrityError:
+            # already revoked
+            db.session.rollback()
+        # pick the new row up on this worker's next check rather than waiting for the refresh interval
+        self._refreshed = None
+
+    def is_revoked(self, jti):
+        self._refresh_if_due()
+        self.lookups += 1
+        if jti not in self.filter:
+            return False
+
+        self.db_checks += 1
+        # a lagging replica may not have the revocation yet
+        with on_primary():
+            revoked = db.session.execute(
+                select(RevokedToken.id).where(RevokedToken.jti == jti)
+            ).first() is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    def _refresh_if_due(self):
+        now = time.monotonic()
+        if self._refreshed is not None and now - self._refreshed < self.refresh_seconds:
+            return
+        with self._lock:
+            if self._refreshed is not None and now - self._refreshed < self.refresh_seconds:
+                return
+            if now - self._purged >= self.purge_seconds:
+                self._purged = now
+                if self.purge():
+                    # purged jtis cannot be taken out of a Bloom filter, so start over
+                    self.filter = BloomFilter(self.capacity, self.fp_rate)
+                    self._last_seen = None
+            elif self.filter.count > self.capacity:
+                self.filter = BloomFilter(max(self.capacity, 2 * self.filter.count), self.fp_rate)
+                self._last_seen = None
+
+            query = select(RevokedToken.jti, RevokedToken.revoked_at).where(RevokedToken.expires_at > datetime.utcnow())
+            if self._last_seen is not None:
+                query = query.where(RevokedToken.revoked_at >= self._last_seen - self.refresh_skew)
+            with on_primary():
+                rows = db.session.execute(query).all()
+            for jti, revoked_at in rows:
+                # the overlap returns rows again; adding them twice would only inflate the count
+                if jti not in self.filter:
+                    self.filter.add(jti)
+                if self._last_seen is None or revoked_at > self._last_seen:
+                    self._last_seen = revoked_at
+            self._refreshed = now
+
+    def purge(self):
+        """Delete revocations of tokens that have expired; returns the number removed.
+
+        Runs in its own transaction on its own connection, so purging from
+        inside a request never commits the request's pending work.
+        """
+        with db.engine.begin() as connection:
+            return connection.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+            ).rowcount
+
+    def stats(self):
+        stored = db.session.execute(select(func.count()).select_from(RevokedToken)).scalar()
+        return {
+            "revokedTokens": stored,
+            "filterItems": self.filter.count,
+            "filterCapacity": self.filter.capacity,
+            "filterBits": self.filter.size,
+            "filterHashes": self.filter.hashes,
+            "filterBytes": len(self.filter.bits),
+            "expectedFalsePositiveRate": self.filter.false_positive_rate(),
+            "lookups": self.lookups,
+            "databaseChecks": self.db_checks,
+            "falsePositives": self.false_positives,
+            "observedFalsePositiveRate": self.false_positives / self.lookups if self.lookups else 0.0
+        }
+
+
+revocation_list = RevocationList()
@@ -0,0 +1,168 @@
+from datetime import date
+from sqlalchemy import select, delete, func
+from models.order import Order, OrderItem
+from models.sales import ProductSalesDaily, OrderStatusDaily
+from extensions import db
+from utils.upsert import upsert_add
+
+# The rollups are kept current by the order endpoints: every write adds
+# deltas to the affected (day, product) and (day, status) rows inside the
+# same transaction as the order change, so reports never scan orders.
+
+FUNNEL = ('pending', 'paid', 'shipped', 'completed')
+
+
+def record_order(order, lines):
+    # lines are (product_id, quantity, unit_price) for a newly created order
+    day = order.created_at.date()
+    sales = {}
+    for product_id, quantity, unit_price in lines:
+        units, revenue = sales.get(product_id, (0, 0))
+        sales[product_id] = (units + quantity, revenue + quantity * unit_price)
+
+    upsert_add(ProductSalesDaily, ('day', 'product_id'), [
+        {"day": day, "product_id": product_id, "units": units, "revenue": revenue}
+        for product_id, (units, revenue) in sales.items()
+    ])
+    upsert_add(OrderStatusDaily, ('day', 'status'), [
+        {"day": day, "status": order.status or 'pending', "orders": 1, "revenue": order.total_price}
+    ])
+
+
+def record_status_change(order, old_status, new_status):
+    if old_status == new_status:
+        return
+    day = order.created_at.date()
+    upsert_add(OrderStatusDaily, ('day', 'status'), [
+        {"day": day, "status": old_status, "orders": -1, "revenue": -order.total_price},
+        {"day": day, "status": new_status, "orders": 1, "revenue": order.total_price},
+    ])
+
+
+def remove_order(order):
+    # a deleted order stops counting toward every rollup
+    day = order.created_at.date()
+    rows = db.session.execute(
+        select(OrderItem.product_id, func.sum(OrderItem.quantity),
+               func.sum(OrderItem.quantity * OrderItem.unit_price))
+        .where(OrderItem.order_id == order.id)
+        .group_by(OrderItem.product_id)
+    )
+    upsert_add(ProductSalesDaily, ('day', 'product_id'), [
+        {"day": day, "product_id": product_id, "units": -units, "revenue": -revenue}
+        for product_id, units, revenue in rows
+    ])
+    upsert_add(OrderStatusDaily, ('day', 'status'), [
+        {"day": day, "status": order.status, "orders": -1, "revenue": -order.total_price}
+    ])
+
+
+def rebuild_rollups(chunk_size=5000):
+    """Recompute both rollups from the order tables.
+
+    Orders are aggregated in id ranges of chunk_size orders, and each
+    range's totals are added to the rollups and committed before the next,
+    so no single statement scans or locks the whole order history. Run it
+    while orders are not being written, or the rollups may drift by the
+    orders written during the rebuild. Returns the number of orders read.
+    """
+    db.session.execute(delete(ProductSalesDaily))
+    db.session.execute(delete(OrderStatusDaily))
+    db.session.commit()
+
+    day = func.date(Order.created_at)
+    last_id = 0
+    orders_read = 0
+    while True:
+        ids = db.session.execute(
+            select(Order.id).where(Order.id > last_id).order_by(Order.id).limit(chunk_size)
+        ).scalars().all()
+        if not ids:
+            break
+        in_range = (Order.id >= ids[0], Order.id <= ids[-1], Order.is_deleted == False)
+
+        product_rows = db.session.execute(
+            select(day, OrderItem.product_id, func.sum(OrderItem.quantity),
+                   func.sum(OrderItem.quantity * OrderItem.unit_price))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(*in_range)
+            .group_by(day, OrderItem.product_id)
+        )
+        upsert_add(ProductSalesDaily, ('day', 'product_id'), [
+            {"day": _as_date(row_day), "product_id": product_id, "units": units, "revenue": revenue}
+            for row_day, product_id, units, revenue in product_rows
+        ])
+
+        status_rows = db.session.execute(
+            select(day, Order.status, func.count(), func.sum(Order.total_price))
+            .where(*in_range)
+            .group_by(day, Order.status)
+        )
+        upsert_add(OrderStatusDaily, ('day', 'status'), [
+            {"day": _as_date(row_day), "status": status, "orders": orders, "revenue": revenue}
+            for row_day, status, orders, revenue in status_rows
+        ])
+
+        db.session.commit()
+        orders_read += len(ids)
+        last_id = ids[-1]
+    return orders_read
+
+
+def top_products(date_from, date_to, limit, by='revenue'):
+    units = func.sum(ProductSalesDaily.units).label('units')
+    revenue = func.sum(ProductSalesDaily.revenue).label('revenue')
+    query = select(ProductSalesDaily.product_id, units, revenue) \
+        .group_by(ProductSalesDaily.product_id) \
+        .having(units > 0) \
+        .order_by((units if by == 'units' else revenue).desc(), ProductSalesDaily.product_id) \
+        .limit(limit)
+    query = _between(query, ProductSalesDaily.day, date_from, date_to)
+    return [
+        {"productId": product_id, "units": units, "revenue": round(revenue, 2)}
+        for product_id, units, revenue in db.session.execute(query)
+    ]
+
+
+def revenue_series(date_from, date_to, interval='day'):
+    query = select(ProductSalesDaily.day, func.sum(ProductSalesDaily.units), func.sum(ProductSalesDaily.revenue)) \
+        .group_by(ProductSalesDaily.day).order_by(ProductSalesDaily.day)
+    query = _between(query, ProductSalesDaily.day, date_from, date_to)
+
+    # days are bucketed here so the query stays portable across databases
+    buckets = {}
+    for day, units, revenue in db.session.execute(query):
+        day = _as_date(day)
+        key = day.strftime('%Y-%m') if interval == 'month' else day.isoformat()
+        bucket = buckets.setdefault(key, {"period": key, "units": 0, "revenue": 0})
+        bucket["units"] += units
+        bucket["revenue"] += revenue
+    return [dict(bucket, revenue=round(bucket["revenue"], 2)) for bucket in buckets.values()]
+
+
+def status_funnel(date_from, date_to):
+    query = select(OrderStatusDaily.status, func.sum(OrderStatusDaily.orders), func.sum(OrderStatusDaily.revenue)) \
+        .group_by(OrderStatusDaily.status)
+    query = _between(query, OrderStatusDaily.day, date_from, date_to)
+    totals = {status: (orders, revenue) for status, orders, revenue in db.session.execute(query)}
+
+    # each stage counts the orders that reached it, i.e. are in it or any later stage
+    funnel = []
+    for index, status in enumerate(FUNNEL):
+        reached = sum(totals.get(later, (0, 0))[0] for later in FUNNEL[index:])
+        orders, revenue = totals.get(status, (0, 0))
+        funnel.append({"status": status, "orders": orders, "revenue": round(revenue, 2), "reached": reached})
+    return funnel
+
+
+def _between(query, column, date_from, date_to):
+    if date_from:
+        query = query.where(column >= date_from)
+    if date_to:
+        query = query.where(column <= date_to)
+    return query
+
+
+def _as_date(value):
+    # SQLite's date() returns text
+    return value if isinstance(value, date) else date.fromisoformat(value)
@@ -0,0 +1,117 @@
+import re
+from sqlalchemy import text, select, func, and_, or_, inspect, Integer, Float
+from sqlalchemy.dialects.mysql import match
+from models.product import Product
+from extensions import db
+
+# SQLite keeps an external-content FTS5 index over product(name, description)
+# in sync with triggers; MySQL uses a FULLTEXT index (see the search migration).
+# Any other database falls back to LIKE.
+SQLITE_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5("
+    "name, description, content='product', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ai AFTER INSERT ON product BEGIN "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_ad AFTER DELETE ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS product_fts_au AFTER UPDATE OF name, description ON product BEGIN "
+    "INSERT INTO product_fts(product_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO product_fts(rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+
+# bm25 column weights: a hit in the name counts ten times a hit in the description
+_SQLITE_MATCHES = text(
+    "SELECT rowid AS id, bm25(product_fts, 10.0, 1.0) AS rank FROM product_fts WHERE product_fts MATCH :query"
+).columns(id=Integer, rank=Float)
+
+_backends = {}
+
+
+def search_products(term, page, per_page):
+    """Return (products, total) for a search, best matches first.
+
+    Every word of the term must match the start of a word in the name or
+    description, so "jad bang" finds "Jade bangle".
+    """
+    tokens = _tokenize(term)
+    if not tokens:
+        return [], 0
+
+    backend = _backend()
+    if backend == 'sqlite':
+        matches = _SQLITE_MATCHES.bindparams(query=' '.join(f'"{token}"*' for token in tokens)).subquery('matches')
+        query = select(Product).join(matches, matches.c.id == Product.id).where(Product.is_deleted == False)
+        ranked = query.order_by(matches.c.rank, Product.id)
+    elif backend == 'mysql':
+        relevance = _mysql_match(tokens)
+        query = select(Product).where(relevance, Product.is_deleted == False)
+        ranked = query.order_by(relevance.desc(), Product.id)
+    else:
+        query = select(Product).where(_like(tokens), Product.is_deleted == False)
+        ranked = query.order_by(Product.id)
+
+    total = db.session.execute(select(func.count()).select_from(query.subquery())).scalar()
+    products = db.session.execute(ranked.limit(per_page).offset((page - 1) * per_page)).scalars().all()
+    return products, total
+
+
+def search_condition(term):
+    # unranked filter for queries that impose their own ordering (keyset pages)
+    tokens = _tokenize(term)
+    if not tokens:
+        return Product.id.is_(None)
+
+    backend = _backend()
+    if backend == 'sqlite':
+        matches = _SQLITE_MATCHES.bindparams(query=' '.join(f'"{token}"*' for token in tokens)).subquery('matches')
+        return Product.id.in_(select(matches.c.id))
+    if backend == 'mysql':
+        return _mysql_match(tokens)
+    return _like(tokens)
+
+
+def create_search_index(rebuild=True):
+    """Create the SQLite FTS5 index and its sync triggers, then fill it.
+
+    The index is kept current by the triggers from then on; rebuilding is
+    only needed after rows were loaded before the index existed.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+
+    with db.engine.begin() as connection:
+        for statement in SQLITE_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+        if rebuild:
+            connection.exec_driver_sql("INSERT INTO product_fts(product_fts) VALUES ('rebuild')")
+    _backends.pop(db.engine, None)
+    return True
+
+
+def _backend():
+    engine = db.engine
+    if engine not in _backends:
+        dialect = engine.dialect.name
+        if dialect == 'sqlite':
+            _backends[engine] = 'sqlite' if inspect(engine).has_table('product_fts') else 'like'
+        elif dialect == 'mysql':
+            _backends[engine] = 'mysql'
+        else:
+            _backends[engine] = 'like'
+    return _backends[engine]
+
+
+def _tokenize(term):
+    return re.findall(r'\w+', term.lower())
+
+
+def _mysql_match(tokens):
+    return match(Product.name, Product.description,
+                 against=' '.join(f'+{token}*' for token in tokens)).in_boolean_mode()
+
+
+def _like(tokens):
+    return and_(*[or_(Product.name.contains(token), Product.description.contains(token)) for token in tokens])
@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library json module is used without it
+    orjson = None
+
+# how every model datetime appears in responses
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+if orjson is not None:
+    # Flask's key order, int keys as strings, and datetimes through default() like the json module
+    ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+# model class -> function returning the model's response dict
+ENCODERS = {}
+
+
+def compile_serializer(name, fields, args=()):
+    """Build a function that turns an object into a dict, from a field spec.
+
+    fields is a sequence of (key, attribute) or (key, attribute, "datetime")
+    tuples, in output order; an attribute listed in args is taken from the
+    function's argument of that name instead of the object. The function is
+    generated as source once, so each call is a single dict display with
+    plain attribute loads - no loop over the spec, no strftime. It accepts
+    model instances and result rows alike.
+    """
+    entries = []
+    for key, attribute, *kind in fields:
+        if attribute in args:
+            value = attribute
+        elif kind == ["datetime"]:
+            # same text as strftime(DATETIME_FORMAT), without parsing the format on every call
+            value = f"(_v.isoformat(' ', 'seconds') if (_v := obj.{attribute}) else None)"
+        else:
+            value = f"obj.{attribute}"
+        entries.append(f"        {key!r}: {value},")
+    source = "\n".join([f"def {name}({', '.join(('obj',) + tuple(args))}):", "    return {", *entries, "    }"])
+    namespace = {}
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+def register(model, encoder):
+    # lets JSONProvider encode instances of model returned straight from a view
+    ENCODERS[model] = encoder
+
+
+class JSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes registered models and datetimes itself.
+
+    Output keeps Flask's defaults (sorted keys, compact separators, ASCII
+    escapes), so responses are byte-for-byte what the default provider
+    produces. orjson is opt-in with JSON_BACKEND=orjson: the JSON is
+    equivalent but not byte-identical, since non-ASCII characters are sent
+    as UTF-8 rather than \\u escapes and floats in exponent form lose the
+    "+" (1e16 rather than 1e+16). Request bodies orjson rejects, such as
+    ones containing NaN, are parsed again by the json module, so they are
+    accepted or refused exactly as before.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        backend = app.config['JSON_BACKEND']
+        if backend not in ('json', 'orjson'):
+            raise RuntimeError(f"JSON_BACKEND must be json or orjson, not {backend}")
+        if backend == 'orjson' and orjson is None:
+            raise RuntimeError("JSON_BACKEND is orjson but orjson is not installed")
+        self.fast = backend == 'orjson'
+
+    @staticmethod
+    def default(o):
+        encoder = ENCODERS.get(type(o))
+        if encoder is not None:
+            return encoder(o)
+        if isinstance(o, datetime):
+            return o.strftime(DATETIME_FORMAT)
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj, **kwargs):
+        # indented (debug) output and unusual arguments go through the json module
+        if self.fast and kwargs.keys() <= {"separators"}:
+            return orjson.dumps(obj, default=self.default, option=ORJSON_OPTIONS).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.fast and not kwargs:
+            try:
+                return orjson.loads(s)
+            except orjson.JSONDecodeError:
+                pass
+        return super().loads(s, **kwargs)
@@ -0,0 +1,146 @@
+import random
+from sqlalchemy import update, select, bindparam
+from models.product import Product, ProductStockShard
+from extensions import db
+
+
+def reserve_stock(quantities):
+    """Atomically take stock for {product_id: quantity}.
+
+    Every decrement is a conditional UPDATE (``stock >= quantity``), so two
+    workers can never both take the last unit and no row is locked for longer
+    than its own statement. Single-row products are decremented together with
+    one executemany. Returns (ok, insufficient); on failure the session has
+    been rolled back and insufficient lists the products that are short, with
+    their current stock.
+    """
+    sharded = dict(db.session.execute(
+        select(Product.id, Product.stock_shards)
+        .where(Product.id.in_(quantities), Product.stock_shards > 0)
+    ).all())
+
+    rows = [
+        {"product_id": product_id, "quantity": quantity}
+        for product_id, quantity in quantities.items() if product_id not in sharded
+    ]
+    reserved = True
+    if rows:
+        result = db.session.execute(_reserve_row, rows)
+        reserved = result.rowcount == len(rows)
+
+    for product_id, shards in sharded.items():
+        if not reserved:
+            break
+        reserved = _reserve_sharded(product_id, shards, quantities[product_id])
+
+    if reserved:
+        return True, []
+
+    # undo the partial decrements first so the report shows real stock levels
+    db.session.rollback()
+    levels = stock_levels(quantities)
+    insufficient = [
+        {"productId": product_id, "requested": quantity, "available": levels.get(product_id, 0)}
+        for product_id, quantity in quantities.items()
+    ]
+    return False, [line for line in insufficient if line["available"] < line["requested"]] or insufficient
+
+
+def stock_levels(product_ids):
+    rows = db.session.execute(
+        select(Product.id, Product.stock, Product.stock_shards).where(Product.id.in_(product_ids))
+    ).all()
+    levels = {product_id: stock for product_id, stock, _ in rows}
+
+    sharded = [product_id for product_id, _, shards in rows if shards]
+    if sharded:
+        shards = db.session.execute(
+            select(ProductStockShard.product_id, db.func.sum(ProductStockShard.stock))
+            .where(ProductStockShard.product_id.in_(sharded))
+            .group_by(ProductStockShard.product_id)
+        ).all()
+        for product_id, stock in shards:
+            levels[product_id] += stock
+    return levels
+
+
+def set_stock(product, stock):
+    # spread the new level evenly across the shards of a sharded product
+    if not product.stock_shards:
+        product.stock = stock
+        return
+
+    per_shard, remainder = divmod(stock, product.stock_shards)
+    for shard in product.shards:
+        shard.stock = per_shard + (1 if shard.shard_no < remainder else 0)
+    product.stock = 0
+
+
+def set_stock_shards(product, shards):
+    """Switch a product between single-row and sharded-counter stock.
+
+    With N shards the stock lives in N product_stock_shard rows and each
+    reservation starts at a random shard, so concurrent checkouts of a hot
+    product update different rows instead of queueing on one.
+    """
+    stock = product.available_stock
+    ProductStockShard.query.filter_by(product_id=product.id).delete(synchronize_session=False)
+    db.session.expire(product, ['shards'])
+
+    product.stock_shards = shards
+    if shards:
+        for shard_no in range(shards):
+            db.session.add(ProductStockShard(product_id=product.id, shard_no=shard_no, stock=0))
+        db.session.flush()
+        db.session.expire(product, ['shards'])
+    set_stock(product, stock)
+
+
+_product = Product.__table__
+_reserve_row = (
+    update(_product)
+    .where(_product.c.id == bindparam('product_id'),
+           _product.c.is_deleted == False,
+           _product.c.stock >= bindparam('quantity'))
+    .values(stock=_product.c.stock - bindparam('quantity'))
+)
+
+
+def _reserve_sharded(product_id, shards, quantity):
+    # fast path: a single shard covers the whole quantity
+    start = random.randrange(shards)
+    for offset in range(shards):
+        result = db.session.execute(
+            update(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id,
+                   ProductStockShard.shard_no == (start + offset) % shards,
+                   ProductStockShard.stock >= quantity)
+            .values(stock=ProductStockShard.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            return True
+
+    # slow path: gather the quantity from several shards; each take is still
+    # conditional, so a concurrent reservation can only make this one fail
+    remaining = quantity
+    rows = db.session.execute(
+        select(ProductStockShard.shard_no, ProductStockShard.stock)
+        .where(ProductStockShard.product_id == product_id, ProductStockShard.stock > 0)
+    ).all()
+    for shard_no, stock in rows:
+        take = min(stock, remaining)
+        result = db.session.execute(
+            update(ProductStockShard)
+            .where(ProductStockShard.product_id == product_id,
+                   ProductStockShard.shard_no == shard_no,
+                   ProductStockShard.stock >= take)
+            .values(stock=ProductStockShard.stock - take)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount == 1:
+            remaining -= take
+        if not remaining:
+            return True
+
+    return False
@@ -0,0 +1,27 @@
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from extensions import db
+
+
+def upsert_add(model, keys, rows):
+    """Add the non-key columns of rows onto the rows with the same keys, inserting missing ones.
+
+    Uses the database's native upsert with one executemany, so concurrent
+    writers to the same row never lose an update. keys must be the
+    primary key or a unique constraint.
+    """
+    if not rows:
+        return
+    table = model.__table__
+    counters = [name for name in rows[0] if name not in keys]
+    dialect = db.session.get_bind().dialect.name
+
+    if dialect == 'mysql':
+        statement = mysql.insert(table)
+        statement = statement.on_duplicate_key_update(
+            {name: table.c[name] + statement.inserted[name] for name in counters})
+    else:
+        statement = postgresql.insert(table) if dialect == 'postgresql' else sqlite.insert(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={name: table.c[name] + statement.excluded[name] for name in counters})
+    db.session.execute(statement, rows)
@@ -0,0 +1,46 @@
+import logging
+import time
+from sqlalchemy.orm import configure_mappers
+from extensions import db
+from utils.metrics import metrics
+
+log = logging.getLogger('jade.warmup')
+
+# read-only requests whose queries are compiled before the first real client arrives
+WARMUP_PATHS = (
+    '/products/all',
+    '/products/all?limit=20',
+    '/products/all?limit=20&sort=price',
+    '/products/all?search=jade',
+    '/products/1',
+    '/orders/all',
+    '/orders/all?userId=1&limit=10',
+    '/orders/1',
+    '/users/1',
+    '/cart/1',
+)
+
+
+def warm_up(app):
+    """Pay the first-request costs once, in the server's master process.
+
+    Configures the ORM mappers and sends WARMUP_PATHS through the test
+    client, which fills SQLAlchemy's compiled statement cache and the
+    routing and serializer code paths. Forked workers inherit all of it.
+    Pooled connections are then disposed so no worker shares a socket
+    with another. Returns the seconds spent.
+    """
+    started = time.perf_counter()
+    configure_mappers()
+    client = app.test_client()
+    for path in WARMUP_PATHS:
+        try:
+            client.get(path)
+        except Exception:
+            # a missing table or unreachable database only costs the warmup
+            log.exception("warmup request %s failed", path)
+    metrics.reset()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    return time.perf_counter() - started
@@ -0,0 +1,9 @@
+"""WSGI entry point for production servers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+from app import create_app
+from utils.warmup import warm_up
+
+app = create_app()
+warmup_seconds = warm_up(app) if app.config['WARMUP_ENABLED'] else 0.0